@@ -0,0 +1,140 @@
+"""
+Synthetic fixtures for the benchmarks: a rendered 24-patch palette with CA
+and dark rectangles written as a multi-level pyramidal TIFF, its object
+coordinates, random slide tiles and calibration data.
+"""
+
+import os
+
+import cv2
+import numpy as np
+import pandas as pd
+import tifffile
+
+# palette layout in pixels of a scale 1 render (y0, y1, x0, x1)
+PALETTE_HEIGHT, PALETTE_WIDTH = 1100, 1000
+RECTANGLES = {
+    "rect_CA": (30, 330, 40, 980),
+    "rect_1000": (360, 960, 60, 440),
+    "rect_750": (360, 880, 480, 800),
+    "rect_500": (360, 760, 830, 990),
+}
+BACKGROUND, WHITE = 60, 235
+ANGLE = 1.0
+
+
+def _rotation(scale):
+    centre = (PALETTE_WIDTH * scale / 2, PALETTE_HEIGHT * scale / 2)
+    return cv2.getRotationMatrix2D(centre, ANGLE, 1.0)
+
+
+def _circles(scale):
+    # (key, y, x, radius) of the 24 circles of each zone, before rotation
+    circles = []
+    for name, rect in RECTANGLES.items():
+        if name == "rect_CA":
+            continue
+        y0, y1, x0, x1 = [v * scale for v in rect]
+        h, w = y1 - y0, x1 - x0
+        radius = int(min(w / 4, h / 6) * 0.32)
+        for i in range(6):
+            for j in range(4):
+                key = f"{'ABCD'[j]}{6 - i}_{name[5:]}"
+                y, x = int(y0 + (i + 0.5) * h / 6), int(x0 + (j + 0.5) * w / 4)
+                circles.append((key, y, x, radius))
+    return circles
+
+
+def render_palette(scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    image = np.full((PALETTE_HEIGHT * scale, PALETTE_WIDTH * scale, 3), BACKGROUND)
+    image = image.astype(np.uint8)
+    for y0, y1, x0, x1 in RECTANGLES.values():
+        image[y0 * scale : y1 * scale, x0 * scale : x1 * scale] = WHITE
+    for _, y, x, radius in _circles(scale):
+        colour = tuple(int(c) for c in rng.integers(20, 180, 3))
+        cv2.circle(image, (x, y), radius, colour, -1)
+
+    h, w = image.shape[:2]
+    return cv2.warpAffine(
+        image, _rotation(scale), (w, h), borderValue=(BACKGROUND,) * 3
+    )
+
+
+def palette_coordinates(scale=1):
+    # coordinates on the rendered level, in the format of PaletteParser.parse
+    rotation = _rotation(scale)
+    coordinates = {}
+    for name, (y0, y1, x0, x1) in RECTANGLES.items():
+        corners = np.array([[x, y, 1] for x in (x0, x1) for y in (y0, y1)]) * [
+            scale,
+            scale,
+            1,
+        ]
+        xs, ys = (corners @ rotation.T).T
+        coordinates[name] = {
+            "y0": int(ys.min()),
+            "y1": int(ys.max()),
+            "x0": int(xs.min()),
+            "x1": int(xs.max()),
+        }
+    ca = coordinates["rect_CA"]
+    ca_h = ca["y1"] - ca["y0"]
+    coordinates["rect_dark"] = dict(
+        ca, y0=int(ca["y1"] + 0.3 * ca_h), y1=int(ca["y1"] + 0.6 * ca_h)
+    )
+    for key, y, x, radius in _circles(scale):
+        cx, cy = rotation @ [x, y, 1]
+        coordinates[key] = {
+            "x_centroid": int(cx),
+            "y_centroid": int(cy),
+            "radius": radius,
+        }
+    return coordinates
+
+
+def circle_table(coordinates, zone="_1000"):
+    # circle centres of one zone as the "Y"/"X" DataFrame used by circlelib
+    rows = [
+        (value["y_centroid"], value["x_centroid"])
+        for key, value in coordinates.items()
+        if key.endswith(zone) and "x_centroid" in value
+    ]
+    return pd.DataFrame(rows, columns=["Y", "X"])
+
+
+def write_pyramid(path, image, levels=4, tile=256):
+    with tifffile.TiffWriter(path) as tiff:
+        tiff.write(image, tile=(tile, tile), photometric="rgb", subifds=levels - 1)
+        for level in range(1, levels):
+            size = (image.shape[1] >> level, image.shape[0] >> level)
+            downsampled = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            tiff.write(downsampled, tile=(tile, tile), photometric="rgb", subfiletype=1)
+
+
+def palette_pyramid(data_dir, scale):
+    # the pyramid is generated once per scale and reused by later runs
+    path = os.path.join(data_dir, f"palette_x{scale}.tif")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        write_pyramid(tmp_path, render_palette(scale))
+        os.replace(tmp_path, path)
+    return path
+
+
+def slide_tile(size, seed=0):
+    # random tissue-like tile: smooth colour field plus noise, in [0, 1]
+    rng = np.random.default_rng(seed)
+    coarse = rng.random((max(size // 64, 2), max(size // 64, 2), 3))
+    field = cv2.resize(coarse, (size, size), interpolation=cv2.INTER_CUBIC)
+    return np.clip(field + rng.normal(0, 0.02, field.shape), 0, 1)
+
+
+def calibration_data(seed=0):
+    # (train, reference) RGB patch values in [0, 1] of a 25-patch chart
+    rng = np.random.default_rng(seed)
+    reference = rng.uniform(0.05, 0.95, (25, 3))
+    reference[0] = 0.9
+    train = np.clip(0.9 * reference**1.1 + rng.normal(0, 0.01, reference.shape), 0, 1)
+    return train, reference
@@ -0,0 +1,358 @@
+"""
+Benchmarks of the colour_lib hot paths on synthetic fixtures.
+
+Every case runs in a fresh process, so that its peak RSS is not inflated by
+the previous ones. Results are written as JSON with the best wall time,
+throughput in MPix/s and peak RSS of each case, and can be compared with the
+results of another commit. The `src` tree next to this script is benchmarked,
+so the package does not need to be installed:
+
+    python benchmarks/run.py -o results.json
+    python benchmarks/run.py -o new.json --compare results.json -k predict
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+)
+
+from fixtures import (
+    calibration_data,
+    circle_table,
+    palette_coordinates,
+    palette_pyramid,
+    slide_tile,
+)
+
+REGRESSORS = ["pls", "lasso", "vote", "tps", "stacked", "lut"]
+PALETTE_SCALES = [1, 2, 4]
+TILE_SIZES = [512, 1024, 2048]
+# ensemble regressors predict at ~0.1 MPix/s, larger tiles take minutes
+SLOW_TILE_SIZES = [256, 512]
+DELTA_E_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def _regressors():
+    from colour_lib.regressors import (
+        LassoRegressor,
+        PLSRegressor,
+        StackedRegressor,
+        TPSRegressor,
+        VoteRegressor,
+        bake_lut,
+    )
+
+    return {
+        "pls": lambda x, y: PLSRegressor(x, y),
+        "lasso": lambda x, y: LassoRegressor(x, y, 0.01),
+        "vote": lambda x, y: VoteRegressor(
+            x, y, max_depth=2, random_state=0, alpha=0.02
+        ),
+        "tps": lambda x, y: TPSRegressor(x, y, alpha=0.5),
+        "stacked": lambda x, y: StackedRegressor(x, y, random_state=0),
+        "lut": lambda x, y: bake_lut(PLSRegressor(x, y), size=33),
+    }
+
+
+# each setup returns the function to time and the number of pixels it processes
+
+
+def setup_image_read(scale, data_dir):
+    from colour_lib.utils import image_read
+
+    path = palette_pyramid(data_dir, scale)
+    pixels = scale * scale * 1100 * 1000
+    return lambda: image_read(path, 0, "Gamma 1.8"), pixels
+
+
+def setup_image_read_cold(scale, data_dir):
+    # without the decoded tile cache of utils.slidereader
+    from colour_lib.utils import image_read
+    from colour_lib.utils.slidereader import READERS
+
+    path = palette_pyramid(data_dir, scale)
+    pixels = scale * scale * 1100 * 1000
+
+    def run():
+        READERS.close()
+        return image_read(path, 0, "Gamma 1.8")
+
+    return run, pixels
+
+
+def setup_apply_cctf(size, data_dir):
+    from colour_lib.utils import CCTF
+
+    tile = slide_tile(size)
+    return lambda: CCTF.apply_CCTF("decode", "Gamma 1.8", tile), size * size
+
+
+def setup_apply_cctf_integer(size, data_dir):
+    from colour_lib.utils import CCTF
+
+    tile = (slide_tile(size) * 255).astype(np.uint8)
+    return lambda: CCTF.apply_CCTF_integer("decode", "Gamma 1.8", tile), size * size
+
+
+def _setup_fit(name):
+    def setup(size, data_dir):
+        train, reference = calibration_data()
+        factory = _regressors()[name]
+        return lambda: factory(train, reference), len(train)
+
+    return setup
+
+
+def _setup_predict(name):
+    def setup(size, data_dir):
+        regressor = _regressors()[name](*calibration_data())
+        tile = slide_tile(size)
+        return lambda: regressor.predict(tile), size * size
+
+    return setup
+
+
+def setup_calc_rectangle(scale, data_dir):
+    from colour_lib.utils import calc_rectangle, open_level
+
+    level = np.asarray(open_level(palette_pyramid(data_dir, scale), 0))
+    coordinates = palette_coordinates(scale)
+    table = circle_table(coordinates)
+    radius = coordinates["A1_1000"]["radius"] * 0.3
+    return lambda: calc_rectangle(level, table, radius), level.shape[0] * level.shape[1]
+
+
+def setup_calculate_rgb(scale, data_dir):
+    from colour_lib.palette_parser.ObjectColor import ObjectColor
+    from colour_lib.utils import open_level
+
+    level = open_level(palette_pyramid(data_dir, scale), 0)
+    coordinates = palette_coordinates(scale)
+    extractor = ObjectColor()
+    pixels = level.shape[0] * level.shape[1]
+    return (
+        lambda: extractor.calculate_rgb(coordinates, level, verbose=False),
+        pixels,
+    )
+
+
+def setup_find_rectangles(scale, data_dir):
+    from colour_lib.palette_parser.ImageProcessing import ImageProcessing
+    from colour_lib.palette_parser.ObjectDetection import ObjectDetection
+    from colour_lib.utils import open_level
+
+    level = np.asarray(open_level(palette_pyramid(data_dir, scale), 0))
+    thresh = ImageProcessing().gray_thresh(level, "huron")
+    detector = ObjectDetection()
+    return (
+        lambda: detector.find_rectangles(thresh, level, show_image=False),
+        thresh.size,
+    )
+
+
+def setup_find_circles(scale, data_dir):
+    from colour_lib.palette_parser.ObjectDetection import ObjectDetection
+    from colour_lib.palette_parser.PreprocessingPipeline import (
+        PreprocessingPipeline,
+    )
+    from colour_lib.utils import open_level
+
+    level = np.asarray(open_level(palette_pyramid(data_dir, scale), 0))
+    rect = palette_coordinates(scale)["rect_1000"]
+    crop = level[rect["y0"] : rect["y1"], rect["x0"] : rect["x1"]]
+    edges = PreprocessingPipeline()(crop)
+    detector = ObjectDetection()
+    return lambda: detector.find_circles(edges, averaging_threshold=10), edges.size
+
+
+def setup_preprocess_crop(scale, data_dir):
+    from colour_lib.palette_parser.PreprocessingPipeline import (
+        PreprocessingPipeline,
+    )
+    from colour_lib.utils import open_level
+
+    level = np.asarray(open_level(palette_pyramid(data_dir, scale), 0))
+    rect = palette_coordinates(scale)["rect_1000"]
+    crop = np.ascontiguousarray(level[rect["y0"] : rect["y1"], rect["x0"] : rect["x1"]])
+    pipeline = PreprocessingPipeline()
+    return lambda: pipeline(crop), crop.shape[0] * crop.shape[1]
+
+
+def _setup_write_slide(suffix):
+    def setup(scale, data_dir):
+        from colour_lib.utils import apply_tiled, open_level
+
+        level = open_level(palette_pyramid(data_dir, scale), 0)
+        output = os.path.join(data_dir, f"written_{scale}{suffix}")
+        pixels = level.shape[0] * level.shape[1]
+        return lambda: apply_tiled(lambda tile: tile, level, output, 512), pixels
+
+    return setup
+
+
+def setup_calculate_delta_E(size, data_dir):
+    from colour_lib.utils import calculate_delta_E
+
+    rng = np.random.default_rng(0)
+    observe = rng.uniform(0.05, 0.9, (size, 3))
+    reference = np.clip(observe + rng.normal(0, 0.01, observe.shape), 0.01, 1)
+    return lambda: calculate_delta_E(observe, reference), size
+
+
+def setup_parse(scale, data_dir):
+    from colour_lib.palette_parser.PaletteParser import PaletteParser
+
+    path = palette_pyramid(data_dir, scale)
+    parser = PaletteParser(track_memory=False)
+    pixels = scale * scale * 1100 * 1000
+    return lambda: parser.parse(path, "huron", large_level=0), pixels
+
+
+BENCHMARKS = {
+    "image_read": (setup_image_read, PALETTE_SCALES),
+    "image_read_cold": (setup_image_read_cold, PALETTE_SCALES),
+    "apply_CCTF": (setup_apply_cctf, TILE_SIZES),
+    "apply_CCTF_integer": (setup_apply_cctf_integer, TILE_SIZES),
+    **{f"fit_{name}": (_setup_fit(name), [25]) for name in REGRESSORS},
+    **{
+        f"predict_{name}": (
+            _setup_predict(name),
+            SLOW_TILE_SIZES if name in ("vote", "stacked") else TILE_SIZES,
+        )
+        for name in REGRESSORS
+    },
+    "calc_rectangle": (setup_calc_rectangle, PALETTE_SCALES),
+    "calculate_rgb": (setup_calculate_rgb, PALETTE_SCALES),
+    "find_rectangles": (setup_find_rectangles, PALETTE_SCALES),
+    "find_circles": (setup_find_circles, PALETTE_SCALES),
+    "preprocess_crop": (setup_preprocess_crop, PALETTE_SCALES),
+    "write_ome_tiff": (_setup_write_slide(".ome.tif"), PALETTE_SCALES),
+    "write_zarr": (_setup_write_slide(".zarr"), PALETTE_SCALES),
+    "calculate_delta_E": (setup_calculate_delta_E, DELTA_E_SIZES),
+    # smaller renders are below the rectangle area threshold of find_rectangles
+    "parse": (setup_parse, [4]),
+}
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+def run_case(name, param, data_dir, repeat):
+    setup, _ = BENCHMARKS[name]
+    run, pixels = setup(param, data_dir)
+    setup_rss = _peak_rss_mb()
+
+    run()  # warm-up: lazy imports, caches and allocator
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    best = min(times)
+    return {
+        "name": name,
+        "param": param,
+        "pixels": pixels,
+        "best_seconds": best,
+        "mean_seconds": float(np.mean(times)),
+        "mpix_per_s": pixels / best / 1e6,
+        "setup_rss_mb": setup_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as file:
+        baseline = {
+            (record["name"], record["param"]): record
+            for record in json.load(file)["results"]
+        }
+    for record in results:
+        old = baseline.get((record["name"], record["param"]))
+        if old is not None:
+            ratio = old["best_seconds"] / record["best_seconds"]
+            print(f"{record['name']:>22} {record['param']:>9}: {ratio:6.2f}x speed")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument(
+        "-k", "--filter", default="", help="only run cases whose name contains it"
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument(
+        "--data-dir",
+        default=os.path.join(os.path.dirname(__file__), ".data"),
+        help="where the synthetic pyramids are generated",
+    )
+    parser.add_argument("--compare", help="results JSON of a previous run")
+    args = parser.parse_args(argv)
+
+    for scale in PALETTE_SCALES:
+        palette_pyramid(args.data_dir, scale)
+
+    cases = [
+        (name, param)
+        for name, (_, params) in BENCHMARKS.items()
+        if args.filter in name
+        for param in params
+    ]
+    results = []
+    for name, param in cases:
+        # a fresh process per case, so that peak RSS is per case
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+            future = pool.submit(run_case, name, param, args.data_dir, args.repeat)
+            try:
+                record = future.result()
+            except Exception as error:
+                print(f"{name:>22} {param:>9}: failed: {error!r}", file=sys.stderr)
+                continue
+        results.append(record)
+        print(
+            f"{name:>22} {param:>9}: {record['best_seconds'] * 1e3:10.2f} ms "
+            f"{record['mpix_per_s']:10.2f} MPix/s {record['peak_rss_mb']:8.0f} MB"
+        )
+
+    with open(args.output, "w") as file:
+        json.dump({"environment": environment(), "results": results}, file, indent=1)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from colour_lib.palette_parser.PaletteParser import PaletteParser, patch_table
+from colour_lib.regressors import (
+    LassoRegressor,
+    PLSRegressor,
+    StackedRegressor,
+    TPSRegressor,
+    VoteRegressor,
+)
+from colour_lib.utils import CCTF, RawDataParser, TiledSlideWriter, open_level
+
+SCAN_SUFFIXES = (".tif", ".tiff", ".qptiff")
+# files written by `calibrate_scan`, never taken as scans
+OUTPUT_SUFFIXES = ("_corrected.ome.tif", ".part.ome.tif")
+
+# CCTFs used to decode scanner values in RegressorExps.ipynb
+DEFAULT_CCTF = {"huron": "Gamma 1.0", "polaris": "Gamma 1.8"}
+
+# regressor factories with the parameters used in RegressorExps.ipynb
+REGRESSORS = {
+    "pls": lambda x, y: PLSRegressor(x, y),
+    "lasso": lambda x, y: LassoRegressor(x, y, 0.01),
+    "vote": lambda x, y: VoteRegressor(x, y, max_depth=2, random_state=0, alpha=0.02),
+    "tps": lambda x, y: TPSRegressor(x, y, alpha=0.5),
+    "stacked": lambda x, y: StackedRegressor(x, y, random_state=0),
+}
+
+
+def find_scans(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in os.listdir(item)]
+        else:
+            candidates = glob.glob(item)
+        paths.extend(
+            path
+            for path in candidates
+            if os.path.isfile(path)
+            and path.lower().endswith(SCAN_SUFFIXES)
+            and not path.lower().endswith(OUTPUT_SUFFIXES)
+        )
+    return sorted(set(paths))
+
+
+def scanner_of(path):
+    return "polaris" if path.lower().endswith(".qptiff") else "huron"
+
+
+def output_paths(path, output_dir):
+    stem = os.path.basename(path)
+    for suffix in (".ome.tiff", ".ome.tif") + SCAN_SUFFIXES:
+        if stem.lower().endswith(suffix):
+            stem = stem[: -len(suffix)]
+            break
+    return (
+        os.path.join(output_dir, f"{stem}_corrected.ome.tif"),
+        os.path.join(output_dir, f"{stem}_calibration.json"),
+    )
+
+
+def scan_settings(path, args):
+    # settings a calibration depends on, stored in its report
+    scanner_type = scanner_of(path) if args.scanner == "auto" else args.scanner
+    return {
+        "scanner_type": scanner_type,
+        "cctf_type": args.cctf or DEFAULT_CCTF[scanner_type],
+        "regressor": args.regressor,
+        "colourspace": args.colourspace,
+        "level": args.level,
+        "tile_size": args.tile_size,
+    }
+
+
+def is_up_to_date(path, output_dir, settings=None):
+    # the report is written last, so it marks a finished calibration
+    image_path, report_path = output_paths(path, output_dir)
+    if not (os.path.exists(image_path) and os.path.exists(report_path)):
+        return False
+    if os.path.getmtime(report_path) < os.path.getmtime(path):
+        return False
+    if settings is None:
+        return True
+    try:
+        with open(report_path) as json_file:
+            report = json.load(json_file)
+    except (OSError, ValueError):
+        return False
+    return all(report.get(key) == value for key, value in settings.items())
+
+
+def calibrate_scan(path, args, writer_workers=None):
+    settings = scan_settings(path, args)
+    scanner_type, cctf_type = settings["scanner_type"], settings["cctf_type"]
+    image_path, report_path = output_paths(path, args.output_dir)
+
+    parsed = PaletteParser(track_memory=False).parse(path, scanner_type)
+    train_data = CCTF.apply_CCTF(
+        mode="decode", cctf_type=cctf_type, image=patch_table(parsed["rgb"]) / 255
+    )
+    reference_data = RawDataParser(
+        reference_basepath=args.reference_basepath
+    ).get_reference_rgb(args.colourspace)
+    regressor = REGRESSORS[args.regressor](train_data, reference_data)
+
+    tmp_path = image_path + ".part.ome.tif"
+    level = open_level(path, args.level)
+    try:
+        with TiledSlideWriter(
+            tmp_path, level.shape, level.dtype, args.tile_size, workers=writer_workers
+        ) as writer:
+            regressor.predict_tiled(level, writer, cctf_type, tile_size=args.tile_size)
+        os.replace(tmp_path, image_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    report = {
+        "path": path,
+        **settings,
+        "output": image_path,
+        "coordinates": parsed["coordinates"],
+        "rgb": parsed["rgb"],
+        "metrics": parsed["metrics"],
+    }
+    with open(report_path, "w") as json_file:
+        json.dump(report, json_file)
+
+    return image_path
+
+
+def calibrate(args):
+    os.makedirs(args.output_dir, exist_ok=True)
+    scans = find_scans(args.inputs)
+    todo = [
+        path
+        for path in scans
+        if args.force
+        or not is_up_to_date(path, args.output_dir, scan_settings(path, args))
+    ]
+    print(f"{len(scans)} scans found, {len(scans) - len(todo)} up to date")
+
+    # the cores are shared by the scans corrected at the same time
+    cores = os.cpu_count()
+    concurrent = max(min(args.workers or cores, len(todo)), 1)
+    writer_workers = max(cores // concurrent, 1)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(calibrate_scan, path, args, writer_workers): path
+            for path in todo
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                future.result()
+                print(f"[{done}/{len(todo)}] {path}: done")
+            except Exception as error:
+                failed += 1
+                print(
+                    f"[{done}/{len(todo)}] {path}: failed: {error!r}", file=sys.stderr
+                )
+
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="colour-lib")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    calibrate_parser = commands.add_parser(
+        "calibrate",
+        help="parse the palette, fit a regressor and correct each scan",
+    )
+    calibrate_parser.add_argument(
+        "inputs", nargs="+", help="directories or glob patterns of scans"
+    )
+    calibrate_parser.add_argument("-o", "--output-dir", default="calibrated")
+    calibrate_parser.add_argument(
+        "--reference-basepath",
+        default="./calibration_data/",
+        help="directory with the spectrophotometer wavelengths csv",
+    )
+    calibrate_parser.add_argument(
+        "--scanner", choices=["auto", "huron", "polaris"], default="auto"
+    )
+    calibrate_parser.add_argument(
+        "--cctf", default=None, help="scanner CCTF, defaults to the scanner's one"
+    )
+    calibrate_parser.add_argument(
+        "--regressor", choices=sorted(REGRESSORS), default="pls"
+    )
+    calibrate_parser.add_argument(
+        "--colourspace", choices=["sRGB", "NTSC (1987)"], default="sRGB"
+    )
+    calibrate_parser.add_argument(
+        "--level", type=int, default=0, help="pyramid level to correct"
+    )
+    calibrate_parser.add_argument("--tile-size", type=int, default=1024)
+    calibrate_parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="defaults to all cores"
+    )
+    calibrate_parser.add_argument(
+        "--force", action="store_true", help="recalibrate up-to-date scans"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "calibrate":
+        return calibrate(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import os
+import pickle
+from functools import lru_cache
+
+import numpy as np
+
+from colour_lib.utils.instrumentation import span
+from colour_lib.utils.slidereader import READERS
+from colour_lib.utils.tiles import apply_tiled, tile_slices
+
+REFERENCE_VERSION = 1
+
+
+def bin_shift(dtype, n_bins):
+    # right shift mapping values of `dtype` to `n_bins` (a power of two) bins
+    bits = np.iinfo(dtype).bits
+    shift = bits - int(n_bins).bit_length() + 1
+    if n_bins & (n_bins - 1) or shift < 0:
+        raise ValueError(f"{n_bins} bins do not fit {np.dtype(dtype)} values")
+    return shift
+
+
+class HistogramReference:
+    """
+    Per-channel histogram of a reference image, used to match the histograms
+    of other images to it without the reference image itself (`ref_dict` /
+    `non_ref_matching` in Hist_matching.ipynb).
+
+    The reference is stored as a fixed-size quantile table of shape
+    (channels, n_bins): quantiles[c, v] is the share of pixels of channel c
+    with a value <= v, NaN where the reference has no pixel of value v. The
+    interpolation tables used for matching are built once per reference.
+    """
+
+    def __init__(self, quantiles):
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+        self.n_bins = self.quantiles.shape[1]
+
+        self.tables = []
+        for channel_quantiles in self.quantiles:
+            values = np.flatnonzero(~np.isnan(channel_quantiles))
+            self.tables.append((channel_quantiles[values], values))
+
+    @classmethod
+    def from_counts(cls, counts):
+        counts = np.asarray(counts, dtype=np.float64)
+        quantiles = np.cumsum(counts, axis=1) / counts.sum(axis=1, keepdims=True)
+        quantiles[counts == 0] = np.nan
+        return cls(quantiles)
+
+    @classmethod
+    def from_image(cls, image, n_bins=None):
+        """
+        Parameters:
+        image (numpy array): (h, w, channels) integer reference image, in the
+            same encoding as the images that will be matched to it.
+        n_bins (int): Size of the tables, defaults to the dtype range. A
+            smaller power of two bins the values, e.g. 4096 for uint16.
+        """
+        n_bins = np.iinfo(image.dtype).max + 1 if n_bins is None else n_bins
+        return cls.from_counts(histograms(image, n_bins))
+
+    @classmethod
+    def from_legacy(cls, path):
+        # pickled dict written by `ref_dict` in Hist_matching.ipynb
+        with open(path, "rb") as file:
+            legacy = pickle.load(file)
+        channels = sorted(legacy["values"])
+        max_value = max(max(legacy["values"][c]) for c in channels)
+        n_bins = 256 if max_value < 256 else 1 << 16
+
+        counts = np.zeros((len(channels), n_bins))
+        for i, c in enumerate(channels):
+            counts[i, legacy["values"][c]] = legacy["counts"][c]
+        return cls.from_counts(counts)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            version = int(data["version"])
+            if version != REFERENCE_VERSION:
+                raise ValueError(
+                    f"{path}: histogram reference version {version}, "
+                    f"expected {REFERENCE_VERSION}"
+                )
+            return cls(data["quantiles"])
+
+    def save(self, path):
+        np.savez(path, version=REFERENCE_VERSION, quantiles=self.quantiles)
+
+    def luts(self, source_counts):
+        """
+        Parameters:
+        source_counts (numpy array): (channels, n) histograms of the source.
+
+        Returns:
+        numpy array: (channels, n) tables mapping each source value to the
+        reference value with the same quantile.
+        """
+        source_counts = np.asarray(source_counts, dtype=np.float64)
+        source_quantiles = np.cumsum(source_counts, axis=1) / source_counts.sum(
+            axis=1, keepdims=True
+        )
+        return np.stack(
+            [
+                np.interp(quantiles, ref_quantiles, ref_values)
+                for quantiles, (ref_quantiles, ref_values) in zip(
+                    source_quantiles, self.tables
+                )
+            ]
+        )
+
+
+@lru_cache(maxsize=32)
+def _load_reference(path, mtime):
+    return HistogramReference.load(path)
+
+
+def load_reference(path):
+    """
+    Load a reference saved with `HistogramReference.save`. References are
+    cached in-process by path and are reloaded if the file changes.
+    """
+    path = os.path.abspath(path)
+    return _load_reference(path, os.path.getmtime(path))
+
+
+def histograms(image, n_bins):
+    # (channels, n_bins) histograms of an integer image
+    shift = bin_shift(image.dtype, n_bins)
+    return np.stack(
+        [
+            np.bincount((image[..., c] >> shift).reshape(-1), minlength=n_bins)[:n_bins]
+            for c in range(image.shape[-1])
+        ]
+    )
+
+
+class LUTMatching:
+    """
+    Per-channel lookup tables mapping source values to matched values, built
+    from the histograms of the whole source. Picklable, so it can be used as
+    an `apply_tiled` correction with several workers.
+    """
+
+    def __init__(self, reference, source_counts, dtype):
+        self.dtype = np.dtype(dtype)
+        self.shift = bin_shift(self.dtype, reference.n_bins)
+        luts = reference.luts(source_counts)
+        if self.shift:
+            # matched bins back to values at the centre of the bin
+            luts = (luts + 0.5) * (1 << self.shift) - 0.5
+        self.luts = luts.astype(self.dtype)
+
+    def __call__(self, tile):
+        matched = np.empty_like(tile)
+        for c, lut in enumerate(self.luts):
+            matched[..., c] = lut[tile[..., c] >> self.shift]
+        return matched
+
+
+def match_histograms(source, reference):
+    """
+    Match the per-channel histograms of `source` to `reference`, like
+    `non_ref_matching` in Hist_matching.ipynb.
+
+    Parameters:
+    source (numpy array): (h, w, channels) integer image.
+    reference (HistogramReference or str): Reference or path to one.
+
+    Returns:
+    numpy array: The matched image, with the dtype of `source`.
+    """
+    if isinstance(reference, str):
+        reference = load_reference(reference)
+    counts = histograms(source, reference.n_bins)
+    return LUTMatching(reference, counts, source.dtype)(source)
+
+
+def accumulate_histograms(source, n_bins, tile_size=1024):
+    """
+    Per-channel histograms of a zarr level, read tile by tile.
+
+    Returns:
+    numpy array: (channels, n_bins) counts.
+    """
+    counts = 0
+    for ys, xs in tile_slices(source.shape, tile_size):
+        with READERS.cache.bypass():
+            tile = np.asarray(source[ys, xs])
+        counts = counts + histograms(tile, n_bins)
+    return counts
+
+
+def match_histograms_tiled(source, reference, output, tile_size=1024, workers=1):
+    """
+    Streaming version of `match_histograms` for full-resolution slides: a
+    first pass accumulates the histograms of `source` tile by tile, a second
+    pass applies the per-channel lookup tables tile by tile and writes them
+    to `output`. Only a few tiles are held in memory at a time.
+
+    Parameters:
+    source (zarr array): Integer pyramid level, e.g. from `utils.open_level`.
+    reference (HistogramReference or str): Reference or path to one; its
+        n_bins sets the LUT size, e.g. 256 or 4096.
+    output (zarr array or str): Output array or tiled TIFF path, see
+        `utils.apply_tiled`.
+    tile_size (int): Tile height and width.
+    workers (int): Worker processes of the second pass, see `apply_tiled`.
+
+    Returns:
+    The output array or path.
+    """
+    if isinstance(reference, str):
+        reference = load_reference(reference)
+    with span("accumulate_histograms"):
+        counts = accumulate_histograms(source, reference.n_bins, tile_size=tile_size)
+    matching = LUTMatching(reference, counts, source.dtype)
+    return apply_tiled(
+        matching,
+        source,
+        output,
+        tile_size=tile_size,
+        dtype=source.dtype,
+        workers=workers,
+    )
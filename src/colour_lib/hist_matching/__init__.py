@@ -0,0 +1,7 @@
+from colour_lib.hist_matching.HistogramReference import (
+    HistogramReference,
+    accumulate_histograms,
+    load_reference,
+    match_histograms,
+    match_histograms_tiled,
+)
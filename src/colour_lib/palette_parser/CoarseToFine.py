@@ -0,0 +1,153 @@
+import cv2
+import numpy as np
+
+from colour_lib.utils.instrumentation import traced
+
+
+class CoarseToFineDetector:
+    """
+    Maps palette objects detected on a small pyramid level to a larger one,
+    refining each object level by level. Only small windows around every
+    object are read from the zarr levels, so the cost does not grow with the
+    size of the target level.
+
+    Circles are re-centred on the dark patch found by Otsu thresholding a
+    window around the predicted centre; rectangle corners are moved to the
+    strongest edge next to them. Objects that cannot be refined reliably keep
+    their predicted position.
+    """
+
+    def __init__(self, window_margin=0.5, max_shift=0.25, min_edge_contrast=8):
+        self.window_margin = window_margin
+        self.max_shift = max_shift
+        self.min_edge_contrast = min_edge_contrast
+
+    @traced()
+    def refine(self, zarr_storage, obj_coord_light, light_level, target_level):
+        """
+        Parameters:
+        zarr_storage (zarr group): Pyramid opened with `utils.open_pyramid`.
+        obj_coord_light (dict): Object coordinates on `light_level`, as
+            returned by `ImageAlignment.give_original_coordinates`.
+        light_level (int): Level the objects were detected on.
+        target_level (int): Level to map the objects to, < light_level.
+
+        Returns:
+        dict: Object coordinates on `target_level`, rounded to integers like
+        `ObjectDetection.scale`.
+        """
+        obj_coord = {
+            key: {k: float(v) for k, v in value.items()}
+            for key, value in obj_coord_light.items()
+        }
+
+        for level in range(light_level - 1, target_level - 1, -1):
+            coarse, fine = zarr_storage[level + 1], zarr_storage[level]
+            sy = fine.shape[0] / coarse.shape[0]
+            sx = fine.shape[1] / coarse.shape[1]
+            uncertainty = int(np.ceil(2 * max(sx, sy))) + 2
+
+            for key, value in obj_coord.items():
+                value = self._scale(value, sy, sx)
+                if "x_centroid" in value:
+                    value = self._refine_circle(fine, value)
+                elif key != "rect_dark":  # derived from rect_CA, has no edges
+                    value = self._refine_rectangle(fine, value, uncertainty)
+                obj_coord[key] = value
+
+        return {
+            key: {k: int(round(v)) for k, v in value.items()}
+            for key, value in obj_coord.items()
+        }
+
+    @staticmethod
+    def _scale(value, sy, sx):
+        # pixel centres: x_fine + 0.5 = (x_coarse + 0.5) * sx
+        scaled = {}
+        for k, v in value.items():
+            if k == "radius":
+                scaled[k] = v * (sx + sy) / 2
+            elif k.startswith("x"):
+                scaled[k] = (v + 0.5) * sx - 0.5
+            else:
+                scaled[k] = (v + 0.5) * sy - 0.5
+        return scaled
+
+    @staticmethod
+    def _read_gray(level, y0, y1, x0, x1):
+        y0, x0 = max(int(y0), 0), max(int(x0), 0)
+        y1, x1 = min(int(y1), level.shape[0]), min(int(x1), level.shape[1])
+        if y1 - y0 < 3 or x1 - x0 < 3:
+            return None, y0, x0
+        window = np.ascontiguousarray(level[y0:y1, x0:x1])
+        if window.ndim == 3:
+            window = cv2.cvtColor(window, cv2.COLOR_RGB2GRAY)
+        return window, y0, x0
+
+    def _refine_circle(self, level, value):
+        x, y, r = value["x_centroid"], value["y_centroid"], value["radius"]
+        half = r * (1 + self.window_margin)
+        window, wy0, wx0 = self._read_gray(
+            level, y - half, y + half + 1, x - half, x + half + 1
+        )
+        if window is None:
+            return value
+
+        blurred = cv2.GaussianBlur(window, (5, 5), 0)
+        _, mask = cv2.threshold(
+            blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU
+        )
+        n, labels, stats, centroids = cv2.connectedComponentsWithStats(mask)
+        if n < 2:
+            return value
+
+        # the foreground component closest to the predicted centre
+        centre = np.array([x - wx0, y - wy0])
+        distances = np.linalg.norm(centroids[1:] - centre, axis=1)
+        label = 1 + int(np.argmin(distances))
+        area = stats[label, cv2.CC_STAT_AREA]
+
+        expected_area = np.pi * r**2
+        if not 0.5 * expected_area <= area <= 1.5 * expected_area:
+            return value
+        if distances[label - 1] > self.max_shift * r:
+            return value
+
+        refined = dict(value)
+        refined["x_centroid"] = wx0 + centroids[label][0]
+        refined["y_centroid"] = wy0 + centroids[label][1]
+        return refined
+
+    def _edge(self, profile):
+        # position of the strongest step of a 1D profile, None if too weak
+        steps = np.abs(np.diff(profile))
+        if steps.size == 0 or steps.max() < self.min_edge_contrast:
+            return None
+        return int(np.argmax(steps)) + 0.5
+
+    def _refine_rectangle(self, level, value, m):
+        refined = dict(value)
+        corners = [("x0", "y0", "x1", "y1"), ("x1", "y1", "x0", "y0")]
+        for kx, ky, kx_other, ky_other in corners:
+            xc, yc = value[kx], value[ky]
+            dx = 1 if value[kx_other] >= xc else -1
+            dy = 1 if value[ky_other] >= yc else -1
+
+            # horizontal edge: rows around yc, a few columns inside the rectangle
+            xa, xb = sorted([xc + dx * m, xc + dx * 3 * m])
+            window, wy0, _ = self._read_gray(level, yc - m, yc + m + 1, xa, xb + 1)
+            if window is not None:
+                edge = self._edge(window.mean(axis=1))
+                if edge is not None:
+                    # first pixel inside the rectangle
+                    refined[ky] = wy0 + edge + 0.5 * dy
+
+            # vertical edge: columns around xc, a few rows inside the rectangle
+            ya, yb = sorted([yc + dy * m, yc + dy * 3 * m])
+            window, _, wx0 = self._read_gray(level, ya, yb + 1, xc - m, xc + m + 1)
+            if window is not None:
+                edge = self._edge(window.mean(axis=0))
+                if edge is not None:
+                    refined[kx] = wx0 + edge + 0.5 * dx
+
+        return refined
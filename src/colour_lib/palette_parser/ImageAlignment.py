@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 
+from colour_lib.utils.instrumentation import traced
+
 
 class ImageAlignment:
     def __init__(self):
@@ -35,6 +37,7 @@ class ImageAlignment:
 
         return flipped
 
+    @traced()
     def rotate(self, image_to_rotate, show_image, image_to_show):
         h, w = image_to_rotate.shape[:2]
         gray = cv2.cvtColor(image_to_rotate, cv2.COLOR_BGR2GRAY)
@@ -80,135 +83,114 @@ class ImageAlignment:
 
         return image_rotated, image_to_show
 
-    def give_original_coordinates(self, coordinates, w, h, type):
-
-        def flip_coordinates_horizontal(coordinates, width, type):
-
-            flipped_dict = {}
-
-            if type == "circle":
-                for key, value in coordinates.items():
-                    x_new = width - value["x_centroid"]
-                    flipped_dict[key] = {
-                        "x_centroid": x_new,
-                        "y_centroid": value["y_centroid"],
-                        "radius": value["radius"],
-                    }
-            if type == "rectangle":
-                for key, value in coordinates.items():
-                    x0_new = width - value["x0"]
-                    x1_new = width - value["x1"]
-                    flipped_dict[key] = {
-                        "y0": value["y0"],
-                        "y1": value["y1"],
-                        "x0": x0_new,
-                        "x1": x1_new,
-                    }
-
-            return flipped_dict
-
-        def flip_coordinates_vertical(coordinates, height, type):
-
-            flipped_dict = {}
-
-            if type == "circle":
-                for key, value in coordinates.items():
-                    y_new = height - value["y_centroid"]
-                    flipped_dict[key] = {
-                        "x_centroid": value["x_centroid"],
-                        "y_centroid": y_new,
-                        "radius": value["radius"],
-                    }
-            if type == "rectangle":
-                for key, value in coordinates.items():
-                    y0_new = height - value["y0"]
-                    y1_new = height - value["y1"]
-                    flipped_dict[key] = {
-                        "y0": y0_new,
-                        "y1": y1_new,
-                        "x0": value["x0"],
-                        "x1": value["x1"],
-                    }
-
-            return flipped_dict
-
-        def rotate_coordinates(coordinates, width, height, theta, type):
-
-            def rotate_coordinate(x, y, cx, cy, theta):
-
-                # Convert angle to radians
-                theta = np.radians(theta)
-                # Step 1: Translate point to origin
-                x_origin = x - cx
-                y_origin = y - cy
-                # Step 2: Apply rotation matrix
-                x_rotated = x_origin * np.cos(theta) - y_origin * np.sin(theta)
-                y_rotated = x_origin * np.sin(theta) + y_origin * np.cos(theta)
-                # Step 3: Translate point back
-                x_new = x_rotated + cx
-                y_new = y_rotated + cy
-
-                return x_new, y_new
-
-            cx = int(width / 2)
-            cy = int(height / 2)
-            rotated_dict = {}
+    def alignment_matrix(self, w, h, scale_factor=1, inverse=False):
+        """
+        Compose the flips and the rotation found by `flip` and `rotate` (and an
+        optional pyramid scale factor, see `ObjectDetection.scale_factor`) into
+        one 3x3 affine matrix mapping aligned (x, y) coordinates to the original
+        image. With inverse=True the matrix maps original coordinates back to the
+        aligned image.
+        """
+
+        def rotation(theta, cx, cy):
+            theta = np.radians(theta)
+            cos, sin = np.cos(theta), np.sin(theta)
+            return np.array(
+                [
+                    [cos, -sin, cx - cos * cx + sin * cy],
+                    [sin, cos, cy - sin * cx - cos * cy],
+                    [0.0, 0.0, 1.0],
+                ]
+            )
 
-            if type == "circle":
-                for key, value in coordinates.items():
-                    x_new, y_new = rotate_coordinate(
-                        value["x_centroid"], value["y_centroid"], cx, cy, theta
-                    )
-                    rotated_dict[key] = {
-                        "x_centroid": x_new,
-                        "y_centroid": y_new,
-                        "radius": value["radius"],
-                    }
-
-            if type == "rectangle":
-                for key, value in coordinates.items():
-                    x0_new, y0_new = rotate_coordinate(
-                        value["x0"], value["y0"], cx, cy, theta
-                    )
-                    x1_new, y1_new = rotate_coordinate(
-                        value["x1"], value["y1"], cx, cy, theta
-                    )
-                    rotated_dict[key] = {
-                        "y0": y0_new,
-                        "y1": y1_new,
-                        "x0": x0_new,
-                        "x1": x1_new,
-                    }
-            return rotated_dict
-
-        # MAIN PART
-        coordinates_unsettled = coordinates.copy()
+        cx = int(w / 2)
+        cy = int(h / 2)
+        matrix = np.eye(3)
 
         # 1. FLIP
-
         if self.position.get("flip_horizontal"):
-            print("Flip horizontal")
-            coordinates_unsettled = flip_coordinates_horizontal(
-                coordinates_unsettled, w, type
-            )
+            matrix = np.array([[-1.0, 0, w], [0, 1, 0], [0, 0, 1]]) @ matrix
         if self.position.get("flip_vertical"):
-            print("Flip vertical")
-            coordinates_unsettled = flip_coordinates_vertical(
-                coordinates_unsettled, h, type
-            )
+            matrix = np.array([[1.0, 0, 0], [0, -1, h], [0, 0, 1]]) @ matrix
         if self.position.get("flip_over"):
-            print("Flip over")
-            coordinates_unsettled = rotate_coordinates(
-                coordinates_unsettled, w, h, 180, type
-            )
+            matrix = rotation(180, cx, cy) @ matrix
 
         # 2. ROTATION
-
         rotation_angle = -self.position.get("rotation_angle", 0)
         if rotation_angle != 0:
-            print("Rotation angle:", rotation_angle)
-            coordinates_unsettled = rotate_coordinates(
-                coordinates_unsettled, w, h, rotation_angle, type
-            )
+            matrix = rotation(rotation_angle, cx, cy) @ matrix
+
+        # 3. SCALE
+        matrix = np.diag([scale_factor, scale_factor, 1.0]) @ matrix
+
+        return np.linalg.inv(matrix) if inverse else matrix
+
+    @staticmethod
+    def transform_points(points, matrix):
+        # apply a 3x3 affine matrix to an (N, 2) array of (x, y) points
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return points @ matrix[:2, :2].T + matrix[:2, 2]
+
+    def transform_coordinates(self, coordinates, matrix, type, scale_factor=1):
+        # circles and rectangles are mapped as one (N, 2) array of points
+        keys = list(coordinates)
+        if type == "circle":
+            points = [
+                (coordinates[key]["x_centroid"], coordinates[key]["y_centroid"])
+                for key in keys
+            ]
+        elif type == "rectangle":
+            points = [
+                point
+                for key in keys
+                for point in (
+                    (coordinates[key]["x0"], coordinates[key]["y0"]),
+                    (coordinates[key]["x1"], coordinates[key]["y1"]),
+                )
+            ]
+        else:
+            raise ValueError(f"type must be 'circle' or 'rectangle', got {type!r}")
 
-        return coordinates_unsettled
+        transformed = self.transform_points(points, matrix).tolist()
+
+        transformed_dict = {}
+        for i, key in enumerate(keys):
+            if type == "circle":
+                x_new, y_new = transformed[i]
+                transformed_dict[key] = {
+                    "x_centroid": x_new,
+                    "y_centroid": y_new,
+                    "radius": coordinates[key]["radius"] * scale_factor,
+                }
+            else:
+                (x0_new, y0_new), (x1_new, y1_new) = transformed[2 * i : 2 * i + 2]
+                transformed_dict[key] = {
+                    "y0": y0_new,
+                    "y1": y1_new,
+                    "x0": x0_new,
+                    "x1": x1_new,
+                }
+
+        return transformed_dict
+
+    def give_original_coordinates(
+        self, coordinates, w, h, type, verbose=True, scale_factor=1
+    ):
+        if verbose:
+            if self.position.get("flip_horizontal"):
+                print("Flip horizontal")
+            if self.position.get("flip_vertical"):
+                print("Flip vertical")
+            if self.position.get("flip_over"):
+                print("Flip over")
+            rotation_angle = -self.position.get("rotation_angle", 0)
+            if rotation_angle != 0:
+                print("Rotation angle:", rotation_angle)
+
+        matrix = self.alignment_matrix(w, h, scale_factor=scale_factor)
+        return self.transform_coordinates(coordinates, matrix, type, scale_factor)
+
+    def give_aligned_coordinates(self, coordinates, w, h, type, scale_factor=1):
+        # inverse of `give_original_coordinates`
+        matrix = self.alignment_matrix(w, h, scale_factor=scale_factor, inverse=True)
+        return self.transform_coordinates(coordinates, matrix, type, 1 / scale_factor)
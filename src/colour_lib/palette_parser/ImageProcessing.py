@@ -31,9 +31,9 @@ class ImageProcessing:
         Returns:
         numpy array: The Sobel magnitude image.
         """
-        sobelx = cv2.Sobel(image, cv2.CV_64F, 1, 0, ksize=3)
-        sobely = cv2.Sobel(image, cv2.CV_64F, 0, 1, ksize=3)
-        image_processed = np.sqrt(sobelx**2 + sobely**2)
+        sobelx = cv2.Sobel(image, cv2.CV_32F, 1, 0, ksize=3)
+        sobely = cv2.Sobel(image, cv2.CV_32F, 0, 1, ksize=3)
+        image_processed = cv2.magnitude(sobelx, sobely, magnitude=sobelx)
         image_processed = cv2.convertScaleAbs(image_processed)
         return image_processed
 
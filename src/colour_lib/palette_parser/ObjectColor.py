@@ -1,29 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import matplotlib.pyplot as plt
 
+from colour_lib.utils.circlelib import circle_pixels
+from colour_lib.utils.instrumentation import traced
+
 
 class ObjectColor:
     def __init__(self):
         pass
 
-    def calculate_rgb(self, coordinates, zarr, filter="_1000"):
+    @traced()
+    def calculate_rgb(
+        self, coordinates, zarr, filter="_1000", max_workers=1, verbose=True
+    ):
+        """
+        Mean RGB of the palette objects. Only each object's bounding box is
+        read from `zarr`, so a large pyramid level is never fully decoded.
+        With max_workers > 1 the objects are read concurrently.
+        """
 
         def mean_rgb_circ(image, x, y, r, margin=0.3):
 
             r = int(r * margin)
 
-            Y, X = np.ogrid[: image.shape[0], : image.shape[1]]
-
-            dist_from_center = np.sqrt((X - x) ** 2 + (Y - y) ** 2)
-
-            mask = dist_from_center <= r
-
-            mean_color = []
-            for i in range(image.shape[2]):
-                channel_mean = image[:, :, i][mask].mean()
-                mean_color.append(channel_mean)
-
-            return np.array(mean_color)
+            return circle_pixels(image, y, x, r).mean(axis=0)
 
         def mean_rgb_rect(image, y0, y1, x0, x1, margin=0.3):
 
@@ -49,33 +51,34 @@ class ObjectColor:
         coordinates_filtered["rect_CA"] = coordinates["rect_CA"]
         coordinates_filtered["rect_dark"] = coordinates["rect_dark"]
 
-        obj_rgb = {}
-        for i, (key, values) in enumerate(coordinates_filtered.items()):
-            print(key)
+        def mean_rgb(item):
+            key, values = item
             if key == "rect_CA" or key == "rect_dark":
                 x0 = values["x0"]
                 x1 = values["x1"]
                 y0 = values["y0"]
                 y1 = values["y1"]
 
-                mean_color = mean_rgb_rect(zarr, y0, y1, x0, x1, margin=0.3)
-                obj_rgb[key] = {
-                    "r": mean_color[0],
-                    "g": mean_color[1],
-                    "b": mean_color[2],
-                }
+                return mean_rgb_rect(zarr, y0, y1, x0, x1, margin=0.3)
 
-            else:
-                x = values["x_centroid"]
-                y = values["y_centroid"]
-                r = values["radius"]
-
-                mean_color = mean_rgb_circ(zarr, x, y, r, margin=0.3)
-                obj_rgb[key] = {
-                    "r": mean_color[0],
-                    "g": mean_color[1],
-                    "b": mean_color[2],
-                }
+            x = values["x_centroid"]
+            y = values["y_centroid"]
+            r = values["radius"]
+
+            return mean_rgb_circ(zarr, x, y, r, margin=0.3)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            mean_colors = pool.map(mean_rgb, coordinates_filtered.items())
+
+        obj_rgb = {}
+        for key, mean_color in zip(coordinates_filtered, mean_colors):
+            if verbose:
+                print(key)
+            obj_rgb[key] = {
+                "r": mean_color[0],
+                "g": mean_color[1],
+                "b": mean_color[2],
+            }
 
         return obj_rgb
 
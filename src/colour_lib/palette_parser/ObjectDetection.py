@@ -2,11 +2,14 @@ import numpy as np
 import cv2
 import matplotlib.pyplot as plt
 
+from colour_lib.utils.instrumentation import traced
+
 
 class ObjectDetection:
     def __init__(self):
         pass
 
+    @traced()
     def find_rectangles(self, image_to_find, image_to_show, show_image=True):
 
         # 1. FIND CONTOURS
@@ -77,7 +80,57 @@ class ObjectDetection:
         else:
             return coordinates, None
 
-    def find_circles(self, image, averaging_threshold, tolerance=0.2):
+    @staticmethod
+    def group_circles(coordinates, threshold=10):
+        """
+        Greedily groups (x, y, radius) candidates: each one joins the first
+        group whose members are all within `threshold` of it, or starts a new
+        group. A grid hash with cells of size `threshold` limits the check to
+        groups with a member in the neighbouring cells.
+
+        Returns:
+        list: Groups as lists of indices into `coordinates`, in creation order.
+        """
+        points = np.asarray(coordinates, dtype=float).reshape(len(coordinates), -1)
+        cell_size = threshold if threshold > 0 else 1
+        cells = [
+            tuple(cell) for cell in np.floor(points / cell_size).astype(int).tolist()
+        ]
+        offsets = [
+            tuple(o - 1 for o in offset)
+            for offset in np.ndindex(*(3,) * points.shape[1])
+        ]
+
+        groups = []
+        members = []  # coordinates of each group's members, as arrays
+        group_cells = {}  # cell -> ids of the groups with a member in it
+        for i, cell in enumerate(cells):
+            candidates = set()
+            for offset in offsets:
+                key = tuple(c + o for c, o in zip(cell, offset))
+                candidates.update(group_cells.get(key, ()))
+
+            placed = None
+            for g in sorted(candidates):
+                distances = np.sqrt(((members[g] - points[i]) ** 2).sum(axis=1))
+                if (distances <= threshold).all():
+                    placed = g
+                    break
+            if placed is None:
+                placed = len(groups)
+                groups.append([i])
+                members.append(points[i : i + 1])
+            else:
+                groups[placed].append(i)
+                members[placed] = points[groups[placed]]
+            group_cells.setdefault(cell, set()).add(placed)
+
+        return groups
+
+    @traced()
+    def find_circles(
+        self, image, averaging_threshold, tolerance=0.2, return_confidence=False
+    ):
 
         def is_circle(contour, width, tolerance):
 
@@ -88,27 +141,6 @@ class ObjectDetection:
             circularity = 4 * np.pi * (area / (perimeter * perimeter))
             return 1 - tolerance <= circularity <= 1 + tolerance
 
-        def average(coordinates, threshold=10):
-
-            def distance(coord1, coord2):
-                return np.linalg.norm(np.array(coord1) - np.array(coord2))
-
-            unique_groups = []
-            for coord in coordinates:
-                placed = False
-                for group in unique_groups:
-                    if all(distance(coord, member) <= threshold for member in group):
-                        group.append(coord)
-                        placed = True
-                        break
-                if not placed:
-                    unique_groups.append([coord])
-
-            mean_values = [
-                np.mean(group, axis=0).astype(int).tolist() for group in unique_groups
-            ]
-            return mean_values
-
         # Find contours in the edge-detected image
         contours, _ = cv2.findContours(image, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
 
@@ -129,10 +161,19 @@ class ObjectDetection:
             circles_coord.append([center[0], center[1], radius])
 
         mean_radius = int(np.mean([c[2] for c in circles_coord]))  #
-        circles_coord = average(circles_coord, threshold=averaging_threshold)  #
+        groups = self.group_circles(circles_coord, threshold=averaging_threshold)
+        circles_coord = [
+            np.mean([circles_coord[i] for i in group], axis=0).astype(int).tolist()
+            for group in groups
+        ]
         for contour in circles_coord:  #
             contour[2] = mean_radius  #
 
+        if return_confidence:
+            # share of candidate contours merged into each circle, relative to
+            # the best supported one
+            sizes = np.array([len(group) for group in groups])
+            return circles_coord, (sizes / sizes.max()).tolist()
         return circles_coord
 
     def circles_coordinates_as_dictionary(self, circles_coord, rect_name):
@@ -184,8 +225,11 @@ class ObjectDetection:
             center = (int(x), int(y))
             cv2.circle(image, center, radius, (0, 255, 0), 20)
 
+    def scale_factor(self, zarr_scaled, zarr_light):
+        return round(zarr_scaled.shape[0] / zarr_light.shape[0])
+
     def scale(self, zarr_scaled, zarr_light, obj_coord_light):
-        scale_factor = round(zarr_scaled.shape[0] / zarr_light.shape[0])
+        scale_factor = self.scale_factor(zarr_scaled, zarr_light)
 
         obj_coord_scaled = {
             outer_key: {
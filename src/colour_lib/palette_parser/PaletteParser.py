@@ -0,0 +1,267 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+from colour_lib.palette_parser.CoarseToFine import CoarseToFineDetector
+from colour_lib.palette_parser.ImageAlignment import ImageAlignment
+from colour_lib.palette_parser.ImageProcessing import ImageProcessing
+from colour_lib.palette_parser.ObjectColor import ObjectColor
+from colour_lib.palette_parser.ObjectDetection import ObjectDetection
+from colour_lib.palette_parser.PreprocessingPipeline import PreprocessingPipeline
+from colour_lib.utils import PATCH_NAMES
+from colour_lib.utils.instrumentation import span
+from colour_lib.utils.tiles import open_pyramid
+
+# settings tuned in palette/parser.ipynb for each scanner
+SCANNER_SETTINGS = {
+    "polaris": {
+        "large_level": 4,
+        "border_size": 20,
+        "contrast": 2,
+        "clahe_passes": 4,
+        "dilate_kernel": 9,
+        "tolerance": 0.3,
+        "drop": ["A1_500"],
+    },
+    "huron": {
+        "large_level": 2,
+        "border_size": None,
+        "contrast": None,
+        "clahe_passes": 4,
+        "dilate_kernel": None,
+        "tolerance": 0.2,
+        "drop": [],
+    },
+}
+
+
+class PaletteParser:
+    """
+    Runs the whole palette detection flow of palette/parser.ipynb on a scan:
+    rectangle detection, alignment, circle detection, mapping back to the
+    original orientation, scaling to a large pyramid level and colour
+    extraction.
+
+    Every stage is timed and, if `track_memory` is set, its peak traced
+    memory is recorded; the records are returned in the "metrics" entry of
+    `parse` and kept in `self.metrics`. Debug images and prints are only
+    produced with `debug=True`.
+
+    With `coarse_to_fine=True` the objects are mapped to the large level with
+    `CoarseToFineDetector`, refining their positions on every intermediate
+    level, instead of a single rounded `ObjectDetection.scale`.
+    """
+
+    def __init__(
+        self, debug=False, track_memory=True, max_workers=1, coarse_to_fine=False
+    ):
+        self.debug = debug
+        self.coarse_to_fine = coarse_to_fine
+        self.track_memory = track_memory
+        self.max_workers = max_workers
+        self.img_processor = ImageProcessing()
+        self.obj_detector = ObjectDetection()
+        self.obj_color_extractor = ObjectColor()
+        self.metrics = []
+
+    @contextmanager
+    def _stage(self, name):
+        if self.track_memory:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        with span(f"parse.{name}"):
+            yield
+        record = {"stage": name, "seconds": time.perf_counter() - start}
+        if self.track_memory:
+            record["peak_bytes"] = tracemalloc.get_traced_memory()[1] - baseline
+        self.metrics.append(record)
+
+    def parse(self, path, scanner_type, large_level=None):
+        """
+        Parameters:
+        path (str): Path to the pyramidal TIFF scan of the palette.
+        scanner_type (str): "huron" or "polaris", see SCANNER_SETTINGS.
+        large_level (int): Pyramid level used for colour extraction,
+            defaults to the scanner setting.
+
+        Returns:
+        dict: "coordinates" and "rgb" of the palette objects on the large
+        level, the alignment "position", per-stage "metrics" and, in debug
+        mode, "debug_images".
+        """
+        settings = SCANNER_SETTINGS[scanner_type]
+        large_level = settings["large_level"] if large_level is None else large_level
+        img_aligner = ImageAlignment()
+        debug_images = {}
+        self.metrics = []
+
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            with self._stage("read"):
+                zarr_storage = open_pyramid(path)
+                small_level = len(zarr_storage) - 2
+                zarr_small_lyr = np.array(zarr_storage[small_level])
+                zarr_large_lyr = zarr_storage[large_level]
+                h, w = zarr_small_lyr.shape[:2]
+
+            with self._stage("preprocess"):
+                zarr_small_lyr_contrasted = self._preprocess(zarr_small_lyr, settings)
+
+            with self._stage("detect_rectangles"):
+                image_processed = self.img_processor.gray_thresh(
+                    image=zarr_small_lyr_contrasted, scanner_type=scanner_type
+                )
+                rect_coordinates, _ = self.obj_detector.find_rectangles(
+                    image_to_find=image_processed,
+                    image_to_show=zarr_small_lyr,
+                    show_image=False,
+                )
+
+            with self._stage("align"):
+                flipped_image = img_aligner.flip(
+                    image_to_flip=zarr_small_lyr_contrasted, pattern=rect_coordinates
+                )
+                zarr_small_lyr_aligned, rot_image_to_show = img_aligner.rotate(
+                    image_to_rotate=flipped_image,
+                    show_image=self.debug,
+                    image_to_show=flipped_image,
+                )
+                if self.debug:
+                    debug_images["rotation"] = rot_image_to_show
+
+            with self._stage("detect_rectangles_aligned"):
+                image_processed = self.img_processor.gray_thresh(
+                    image=zarr_small_lyr_aligned, scanner_type=scanner_type
+                )
+                rect_coordinates, rect_image_to_show = (
+                    self.obj_detector.find_rectangles(
+                        image_to_find=image_processed,
+                        image_to_show=zarr_small_lyr_aligned,
+                        show_image=self.debug,
+                    )
+                )
+                if self.debug:
+                    debug_images["rectangles"] = rect_image_to_show
+
+            with self._stage("detect_circles"):
+                circ_coordinates = self._detect_circles(
+                    zarr_small_lyr_aligned, rect_coordinates, settings
+                )
+
+            with self._stage("original_coordinates"):
+                rect_coordinates_small_lyr = img_aligner.give_original_coordinates(
+                    rect_coordinates, w=w, h=h, type="rectangle", verbose=self.debug
+                )
+                circ_coordinates_small_lyr = img_aligner.give_original_coordinates(
+                    circ_coordinates, w=w, h=h, type="circle", verbose=self.debug
+                )
+                obj_coordinates_small_lyr = {
+                    **rect_coordinates_small_lyr,
+                    **circ_coordinates_small_lyr,
+                }
+                if self.debug:
+                    image = zarr_small_lyr.copy()
+                    self.obj_detector.draw_rectangles(image, rect_coordinates_small_lyr)
+                    self.obj_detector.draw_circles(image, circ_coordinates_small_lyr)
+                    debug_images["objects"] = image
+
+            with self._stage("scale"):
+                if self.coarse_to_fine:
+                    obj_coordinates_large_lyr = CoarseToFineDetector().refine(
+                        zarr_storage,
+                        obj_coordinates_small_lyr,
+                        small_level,
+                        large_level,
+                    )
+                else:
+                    obj_coordinates_large_lyr = self.obj_detector.scale(
+                        zarr_large_lyr, zarr_small_lyr, obj_coordinates_small_lyr
+                    )
+
+            with self._stage("calculate_rgb"):
+                obj_rgb = self.obj_color_extractor.calculate_rgb(
+                    obj_coordinates_large_lyr,
+                    zarr_large_lyr,
+                    max_workers=self.max_workers,
+                    verbose=self.debug,
+                )
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+        result = {
+            "path": path,
+            "scanner_type": scanner_type,
+            "large_level": large_level,
+            "position": dict(img_aligner.position),
+            "coordinates": obj_coordinates_large_lyr,
+            "rgb": obj_rgb,
+            "metrics": list(self.metrics),
+        }
+        if self.debug:
+            result["debug_images"] = debug_images
+        return result
+
+    def _preprocess(self, image, settings):
+        if settings["border_size"] is not None:
+            image = self.img_processor.add_bottom_border(
+                image,
+                self.img_processor.get_brightest_color(image),
+                border_size=settings["border_size"],
+            )
+        if settings["contrast"] is not None:
+            image = self.img_processor.increase_contrast(
+                image, alpha=settings["contrast"], beta=0
+            )
+        return image
+
+    def _detect_circles(self, image, rect_coordinates, settings):
+        circ_coordinates = {}
+        rect_coordinates_with_circles = [
+            key for key in rect_coordinates if ("CA" not in key and "dark" not in key)
+        ]
+
+        crops = []
+        for rect_name in rect_coordinates_with_circles:
+            coords = rect_coordinates[rect_name]
+            crops.append(
+                image[coords["y0"] : coords["y1"], coords["x0"] : coords["x1"]]
+            )
+        pipeline = PreprocessingPipeline.from_settings(
+            settings, max_workers=self.max_workers
+        )
+        crops_processed = pipeline.map(crops)
+
+        for rect_name, crop_processed in zip(
+            rect_coordinates_with_circles, crops_processed
+        ):
+            coords = rect_coordinates[rect_name]
+            crop_circ_coordinates = self.obj_detector.find_circles(
+                crop_processed, averaging_threshold=10, tolerance=settings["tolerance"]
+            )
+            crop_circ_coordinates = self.obj_detector.circles_coordinates_as_dictionary(
+                crop_circ_coordinates, rect_name=rect_name[4:]
+            )
+
+            for key, value in crop_circ_coordinates.items():
+                if "x_centroid" in value:
+                    value["x_centroid"] += coords["x0"]
+                    value["y_centroid"] += coords["y0"]
+
+            circ_coordinates.update(crop_circ_coordinates)
+
+        for key in settings["drop"]:
+            circ_coordinates.pop(key, None)
+
+        return circ_coordinates
+
+
+def patch_table(obj_rgb, zone="_1000"):
+    # (patches, 3) array of raw RGB values in PATCH_NAMES order [CA, A1, ..., D6]
+    keys = ["rect_CA"] + [f"{name}{zone}" for name in PATCH_NAMES[1:]]
+    return np.array([[obj_rgb[key][c] for c in "rgb"] for key in keys])
@@ -0,0 +1,115 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from colour_lib.utils.instrumentation import traced
+
+
+class PreprocessingPipeline:
+    """
+    Runs the crop preprocessing chain of the palette parser: `sobel`, repeated
+    `clahe` and `gray_blur_canny` from ImageProcessing, optionally followed by
+    a dilation.
+
+    Intermediate images are written into buffers that are allocated once per
+    thread and crop shape and reused for the next crops. Sobel derivatives are
+    float32 and combined with `cv2.magnitude`, and the repeated CLAHE passes
+    work on the L channel only, converting to LAB and back once instead of on
+    every pass.
+    """
+
+    def __init__(
+        self,
+        clahe_passes=4,
+        dilate_kernel=None,
+        clip_limit=3.0,
+        tile_grid_size=(8, 8),
+        max_workers=1,
+    ):
+        self.clahe_passes = clahe_passes
+        self.dilate_kernel = (
+            None
+            if dilate_kernel is None
+            else np.ones((dilate_kernel, dilate_kernel), np.uint8)
+        )
+        self.clip_limit = clip_limit
+        self.tile_grid_size = tile_grid_size
+        self.max_workers = max_workers
+        self._local = threading.local()
+
+    @classmethod
+    def from_settings(cls, settings, max_workers=1):
+        # settings as in PaletteParser.SCANNER_SETTINGS
+        return cls(
+            clahe_passes=settings["clahe_passes"],
+            dilate_kernel=settings["dilate_kernel"],
+            max_workers=max_workers,
+        )
+
+    def _buffers(self, shape):
+        local = self._local
+        if getattr(local, "shape", None) != shape:
+            h, w = shape[:2]
+            local.shape = shape
+            local.grad_x = np.empty(shape, np.float32)
+            local.grad_y = np.empty(shape, np.float32)
+            local.bgr = np.empty(shape, np.uint8)
+            local.lab = np.empty(shape, np.uint8)
+            local.lightness = [np.empty((h, w), np.uint8) for _ in range(2)]
+            local.gray = np.empty((h, w), np.uint8)
+            local.edges = np.empty((h, w), np.uint8)
+        if not hasattr(local, "clahe"):
+            local.clahe = cv2.createCLAHE(
+                clipLimit=self.clip_limit, tileGridSize=self.tile_grid_size
+            )
+        return local
+
+    @traced("PreprocessingPipeline")
+    def __call__(self, crop):
+        """
+        Parameters:
+        crop (numpy array): (h, w, 3) uint8 crop of a circles zone.
+
+        Returns:
+        numpy array: The (h, w) uint8 edge map used by `find_circles`.
+        """
+        crop = np.ascontiguousarray(crop)
+        buf = self._buffers(crop.shape)
+
+        # sobel
+        cv2.Sobel(crop, cv2.CV_32F, 1, 0, dst=buf.grad_x, ksize=3)
+        cv2.Sobel(crop, cv2.CV_32F, 0, 1, dst=buf.grad_y, ksize=3)
+        cv2.magnitude(buf.grad_x, buf.grad_y, magnitude=buf.grad_x)
+        cv2.convertScaleAbs(buf.grad_x, dst=buf.bgr)
+
+        # clahe passes on the lightness channel
+        if self.clahe_passes:
+            cv2.cvtColor(buf.bgr, cv2.COLOR_BGR2LAB, dst=buf.lab)
+            src, dst = buf.lightness
+            cv2.extractChannel(buf.lab, 0, dst=src)
+            for _ in range(self.clahe_passes):
+                buf.clahe.apply(src, dst=dst)
+                src, dst = dst, src
+            cv2.insertChannel(src, buf.lab, 0)
+            cv2.cvtColor(buf.lab, cv2.COLOR_LAB2BGR, dst=buf.bgr)
+
+        # gray_blur_canny
+        cv2.cvtColor(buf.bgr, cv2.COLOR_BGR2GRAY, dst=buf.gray)
+        cv2.GaussianBlur(buf.gray, (9, 9), 0, dst=buf.gray)
+        cv2.Canny(buf.gray, 50, 150, edges=buf.edges)
+
+        if self.dilate_kernel is not None:
+            return cv2.dilate(buf.edges, self.dilate_kernel, iterations=1)
+        return buf.edges.copy()
+
+    def map(self, crops):
+        """
+        Run the pipeline on several crops, concurrently if `max_workers` > 1
+        (OpenCV releases the GIL). Returns the edge maps in the order of `crops`.
+        """
+        if self.max_workers == 1:
+            return [self(crop) for crop in crops]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(self, crops))
@@ -1,18 +1,53 @@
 import numpy as np
 from abc import ABC, abstractmethod
 
+from colour_lib.utils.instrumentation import count, span
+from colour_lib.utils.tiles import apply_tiled
+
 
 class AbstractRegressor(ABC):
+    # number of pixels passed to the underlying model at once
+    batch_size = 1 << 20
+
     @abstractmethod
     def __init__(self, train_data, reference_data, **kwargs):
         self.reg
 
+    def predict_pixels(self, pixels):
+        return self.reg.predict(pixels)
+
     @abstractmethod
     def predict(self, img):
-        mod_img = img.copy()
+        # float32 images are predicted into float32, others into float64
+        floating = np.issubdtype(img.dtype, np.floating)
+        pixels = img.reshape(-1, img.shape[-1])
+        mod_img = np.empty(pixels.shape, img.dtype if floating else np.float64)
+
+        count("predict_pixels", pixels.shape[0])
+        with span(f"{type(self).__name__}.predict"):
+            for start in range(0, pixels.shape[0], self.batch_size):
+                stop = start + self.batch_size
+                mod_img[start:stop] = self.predict_pixels(pixels[start:stop])
+
+        np.clip(mod_img, 0, 1, out=mod_img)
+        return mod_img.reshape(img.shape)
 
-        for i, strip in enumerate(mod_img):
-            strip = self.reg.predict(strip)
-            mod_img[i] = strip
+    def predict_tiled(self, source, output, cctf_type, tile_size=1024, workers=1):
+        """
+        Correct a pyramid level tile by tile without loading it into memory.
 
-        return np.clip(mod_img, 0, 1)
+        Parameters:
+        source (zarr array): Raw scanner level, e.g. from `utils.open_level`.
+        output (zarr array or str): Output array or (OME-)TIFF path.
+        cctf_type (str): CCTF used to decode the scanner values, as in `image_read`.
+        tile_size (int): Tile height and width.
+        workers (int): Number of worker processes, None for all cores.
+        """
+        return apply_tiled(
+            self.predict,
+            source,
+            output,
+            tile_size=tile_size,
+            cctf_type=cctf_type,
+            workers=workers,
+        )
@@ -0,0 +1,150 @@
+import numpy as np
+from colour import RGB_to_XYZ
+from colour.models.rgb import RGB_COLOURSPACES
+from typing import Literal
+
+from colour_lib.regressors.AbstractRegressor import AbstractRegressor
+from colour_lib.utils import calculate_delta_E
+
+
+class LUTRegressor(AbstractRegressor):
+    METHOD = Literal["tetrahedral", "trilinear"]
+
+    def __init__(self, table, method: METHOD = "tetrahedral"):
+        # table[r, g, b] holds the output colour for the grid node (r, g, b)
+        assert table.ndim == 4 and table.shape[:3] == (table.shape[0],) * 3
+        assert method in ["tetrahedral", "trilinear"]
+        if table.shape[0] < 2:
+            raise ValueError(
+                f"a LUT needs at least 2 nodes per axis, got {table.shape[0]}"
+            )
+        self.table = table
+        self.method = method
+        self.report = {}
+
+        size = table.shape[0]
+        # planar float32 nodes, one contiguous array per output channel, so
+        # that the gathers are 1-d `np.take` calls
+        self._planes = np.ascontiguousarray(
+            table.reshape(-1, table.shape[-1]).T, dtype=np.float32
+        )
+        self._strides = np.array([size * size, size, 1])
+
+    def _cells(self, pixels):
+        # (3, n) float32 fractions and the flat index of the base node
+        size = self.table.shape[0]
+        scaled = np.clip(pixels.T, 0, 1).astype(np.float32) * (size - 1)
+        # kept in float32, node indices are exact below 2**24
+        base = np.minimum(np.floor(scaled), size - 2)
+        fractions = scaled - base
+        index = base[0] * self._strides[0]
+        index += base[1] * self._strides[1]
+        index += base[2]
+        return index.astype(np.intp), fractions
+
+    def _interpolate(self, nodes_weights, n):
+        out = np.empty((n, len(self._planes)), np.float32)
+        for c, plane in enumerate(self._planes):
+            nodes, weight = nodes_weights[0]
+            channel = weight * np.take(plane, nodes)
+            for nodes, weight in nodes_weights[1:]:
+                channel += weight * np.take(plane, nodes)
+            out[:, c] = channel
+        return out
+
+    def _tetrahedral(self, pixels):
+        base, (fr, fg, fb) = self._cells(pixels)
+        sr, sg, sb = self._strides
+
+        # walk from the base node to the opposite corner along the axes sorted
+        # by decreasing fraction: the 4 visited nodes span the tetrahedron.
+        # The first and last axes are picked with comparisons, ties in a fixed
+        # order so that they always differ.
+        first = np.where((fr >= fg) & (fr >= fb), sr, np.where(fg >= fb, sg, sb))
+        last = np.where((fb <= fg) & (fb <= fr), sb, np.where(fg <= fr, sg, sr))
+        f1 = np.maximum(np.maximum(fr, fg), fb)
+        f3 = np.minimum(np.minimum(fr, fg), fb)
+        f2 = fr + fg + fb - f1 - f3
+
+        opposite = base + (sr + sg + sb)
+        return self._interpolate(
+            [
+                (base, 1 - f1),
+                (base + first, f1 - f2),
+                (opposite - last, f2 - f3),
+                (opposite, f3),
+            ],
+            len(base),
+        )
+
+    def _trilinear(self, pixels):
+        base, (fr, fg, fb) = self._cells(pixels)
+        sr, sg, sb = self._strides
+
+        nodes_weights = []
+        for dr, wr in ((0, 1 - fr), (sr, fr)):
+            for dg, wg in ((0, 1 - fg), (sg, fg)):
+                weight = wr * wg
+                nodes_weights.append((base + (dr + dg), weight * (1 - fb)))
+                nodes_weights.append((base + (dr + dg + sb), weight * fb))
+        return self._interpolate(nodes_weights, len(base))
+
+    def predict_pixels(self, pixels):
+        if self.method == "tetrahedral":
+            return self._tetrahedral(pixels)
+        return self._trilinear(pixels)
+
+    def predict(self, img):
+        return super().predict(img=img)
+
+
+def bake_lut(
+    regressor,
+    size=33,
+    method: LUTRegressor.METHOD = "tetrahedral",
+    patches=None,
+    colourspace=None,
+):
+    """
+    Sample a fitted regressor on a size x size x size grid over [0, 1]^3 and
+    return a LUTRegressor that can replace it for production images.
+
+    The LUT predicts at ~7 MPix/s (tetrahedral) per core, so it only pays off
+    for expensive models such as Vote, Stacked or TPS. PLS and Lasso are
+    applied as an affine map and are several times faster than their LUT.
+
+    Parameters:
+    regressor (AbstractRegressor): Fitted colour-correction model.
+    size (int): Number of grid nodes per axis, e.g. 17, 33 or 65.
+    method (str): "tetrahedral" or "trilinear" interpolation.
+    patches (numpy array): Optional (N, 3) calibration patch values. If given,
+        the LUT is compared against the exact model on them and the deltaE 2000
+        statistics are stored in `lut.report`.
+    colourspace (str): RGB colourspace of the regressor outputs (e.g. "sRGB"),
+        needed for deltaE if the regressor works in RGB rather than XYZ.
+
+    Returns:
+    LUTRegressor: The baked LUT.
+    """
+    if size < 2:
+        raise ValueError(f"a LUT needs at least 2 nodes per axis, got {size}")
+    nodes = np.linspace(0, 1, size)
+    grid = np.stack(np.meshgrid(nodes, nodes, nodes, indexing="ij"), axis=-1)
+    table = np.clip(regressor.predict_pixels(grid.reshape(-1, 3)), 0, 1)
+    lut = LUTRegressor(table.reshape(size, size, size, -1), method=method)
+
+    if patches is not None:
+        exact = regressor.predict(patches[np.newaxis])[0]
+        approx = lut.predict(patches[np.newaxis])[0]
+        if colourspace is not None:
+            exact = RGB_to_XYZ(RGB=exact, colourspace=RGB_COLOURSPACES[colourspace])
+            approx = RGB_to_XYZ(RGB=approx, colourspace=RGB_COLOURSPACES[colourspace])
+        deltas = calculate_delta_E(approx, exact)
+        lut.report = {
+            "size": size,
+            "method": method,
+            "max_delta_E": float(deltas.max()),
+            "mean_delta_E": float(deltas.mean()),
+        }
+
+    return lut
@@ -1,11 +1,12 @@
 from sklearn import linear_model
-from colour_lib.regressors.AbstractRegressor import AbstractRegressor
+from colour_lib.regressors.LinearRegressor import LinearRegressor
 
 
-class LassoRegressor(AbstractRegressor):
+class LassoRegressor(LinearRegressor):
     def __init__(self, train_data, reference_data, alpha):
         self.reg = linear_model.Lasso(alpha=alpha)
         self.reg.fit(train_data, reference_data)
+        self.fit_linear_map(train_data.shape[-1])
 
-    def predict(self, img):
-        return super().predict(img=img)
+    def predict(self, img, inplace=False, cctf_type=None):
+        return super().predict(img=img, inplace=inplace, cctf_type=cctf_type)
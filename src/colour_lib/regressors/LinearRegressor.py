@@ -0,0 +1,76 @@
+import cv2
+import numpy as np
+
+from colour_lib.regressors.AbstractRegressor import AbstractRegressor
+from colour_lib.utils import CCTF
+from colour_lib.utils.instrumentation import count, span
+
+
+class LinearRegressor(AbstractRegressor):
+    """
+    Base of the regressors whose fitted model is an affine map, so that
+    `predict` can apply it as `pixels @ matrix + offset` without going
+    through the model. Subclasses fit `self.reg` and call `fit_linear_map`.
+    """
+
+    def fit_linear_map(self, n_features):
+        # probe the fitted model: the image of 0 is the offset and the images
+        # of the unit vectors give the rows of the matrix
+        probes = np.vstack([np.zeros(n_features), np.eye(n_features)])
+        outputs = np.asarray(self.reg.predict(probes), dtype=np.float64)
+        self.offset = outputs[0]
+        self.matrix = outputs[1:] - self.offset
+
+    def predict_pixels(self, pixels):
+        return pixels @ self.matrix + self.offset
+
+    def _transform(self, pixels, affine):
+        # cv2.transform applies the (out, in + 1) affine map per pixel, for up
+        # to 4 channels
+        if max(affine.shape) > 5:
+            return pixels @ affine[:, :-1].T + affine[:, -1]
+        pixels = np.ascontiguousarray(pixels)
+        return cv2.transform(pixels[:, np.newaxis], affine)[:, 0]
+
+    def predict(self, img, inplace=False, cctf_type=None):
+        """
+        Parameters:
+        img (numpy array): (..., channels) image in [0, 1].
+        inplace (bool): Write the result into `img`, which must be a float
+            array with as many channels as the output.
+        cctf_type (str): If given, the CCTF encoding is applied to each batch
+            right after the prediction.
+
+        Returns:
+        numpy array: The clipped prediction, in float32 for float32 images and
+        float64 otherwise.
+        """
+        floating = img.dtype in (np.float32, np.float64)
+        if inplace and not floating:
+            raise TypeError(
+                f"predict(inplace=True) needs a float32 or float64 image, got {img.dtype}"
+            )
+        dtype = img.dtype if floating else np.float64
+        affine = np.hstack([self.matrix.T, self.offset[:, np.newaxis]]).astype(dtype)
+
+        pixels = img.reshape(-1, img.shape[-1])
+        if inplace:
+            mod_img = pixels
+        else:
+            mod_img = np.empty((pixels.shape[0], affine.shape[0]), dtype)
+
+        count("predict_pixels", pixels.shape[0])
+        with span(f"{type(self).__name__}.predict"):
+            for start in range(0, pixels.shape[0], self.batch_size):
+                stop = start + self.batch_size
+                batch = self._transform(
+                    pixels[start:stop].astype(dtype, copy=False), affine
+                )
+                np.clip(batch, 0, 1, out=batch)
+                if cctf_type is not None:
+                    batch = CCTF.apply_CCTF(
+                        mode="encode", cctf_type=cctf_type, image=batch, dtype=dtype
+                    )
+                mod_img[start:stop] = batch
+
+        return mod_img.reshape(img.shape[:-1] + (affine.shape[0],))
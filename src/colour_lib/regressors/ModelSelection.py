@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from colour_lib.regressors.LassoRegressor import LassoRegressor
+from colour_lib.regressors.PLSregressor import PLSRegressor
+from colour_lib.regressors.ThinPlateSpline import TPSRegressor
+from colour_lib.regressors.VoteRegressor import VoteRegressor
+from colour_lib.utils import calculate_delta_E, rgb_to_xyz, xyz_to_rgb
+from colour_lib.utils.instrumentation import count, span
+
+# regressor families and hyperparameter grids, around the values used in
+# RegressorExps.ipynb
+CANDIDATES = {
+    "PLS": (PLSRegressor, [{}]),
+    "Lasso": (LassoRegressor, [{"alpha": alpha} for alpha in (0.001, 0.01, 0.1)]),
+    "Vote": (
+        VoteRegressor,
+        [{"max_depth": depth, "random_state": 0, "alpha": 0.02} for depth in (2, 4)],
+    ),
+    "TPS": (TPSRegressor, [{"alpha": alpha} for alpha in (0.1, 0.5, 1.0)]),
+}
+
+CACHE_VERSION = 1
+
+
+def _training_pairs(train_data, reference_xyz, space, colourspace):
+    # the notebook fits RGB models on RGB patches and XYZ models on XYZ ones
+    if space == "RGB":
+        return train_data, xyz_to_rgb(reference_xyz, colourspace)
+    return rgb_to_xyz(train_data, colourspace), reference_xyz
+
+
+def _to_xyz(predicted, space, colourspace):
+    return rgb_to_xyz(predicted, colourspace) if space == "RGB" else predicted
+
+
+def _cache_key(
+    train_data, reference_xyz, name, regressor_class, params, space, colourspace
+):
+    # candidate names are free-form, the class tells candidates apart
+    model = f"{regressor_class.__module__}.{regressor_class.__qualname__}"
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(train_data, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(reference_xyz, dtype=np.float64).tobytes())
+    digest.update(
+        json.dumps(
+            [CACHE_VERSION, name, model, params, space, colourspace], sort_keys=True
+        ).encode()
+    )
+    return digest.hexdigest()
+
+
+def evaluate_candidate(
+    regressor_class, params, train_data, reference_xyz, space, colourspace
+):
+    """
+    Leave-one-patch-out deltaE 2000 of a regressor on the patch means: each
+    patch is predicted by a model fitted on all the other patches.
+
+    Returns:
+    (AbstractRegressor, numpy array): The model fitted on all patches and the
+    deltaE of every patch.
+    """
+    x, y = _training_pairs(train_data, reference_xyz, space, colourspace)
+    predicted = np.empty_like(y, dtype=np.float64)
+    for i in range(len(x)):
+        keep = np.arange(len(x)) != i
+        model = regressor_class(x[keep], y[keep], **params)
+        predicted[i] = model.predict(x[i : i + 1])[0]
+
+    deltas = calculate_delta_E(_to_xyz(predicted, space, colourspace), reference_xyz)
+    return regressor_class(x, y, **params), deltas[..., 0]
+
+
+def _run_candidate(name, regressor_class, params, space, data, cache_dir):
+    train_data, reference_xyz, colourspace = data
+    cache_path = None
+    if cache_dir is not None:
+        key = _cache_key(
+            train_data, reference_xyz, name, regressor_class, params, space, colourspace
+        )
+        cache_path = os.path.join(cache_dir, f"model_{key}.joblib")
+        if os.path.exists(cache_path):
+            count("model_cache_hits")
+            return joblib.load(cache_path)
+        count("model_cache_misses")
+
+    with span("evaluate_candidate", candidate=name, space=space):
+        model, deltas = evaluate_candidate(
+            regressor_class, params, train_data, reference_xyz, space, colourspace
+        )
+    result = {
+        "name": name,
+        "space": space,
+        "params": params,
+        "model": model,
+        "deltas": deltas,
+    }
+
+    if cache_path is not None:
+        # write to a temporary file first, so that concurrent runs never see a
+        # partial file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        joblib.dump(result, tmp_path)
+        os.replace(tmp_path, cache_path)
+    return result
+
+
+def select_model(
+    train_data,
+    reference_xyz,
+    colourspace="sRGB",
+    candidates=CANDIDATES,
+    spaces=("RGB", "XYZ"),
+    n_jobs=-1,
+    cache_dir=None,
+):
+    """
+    Fit every candidate regressor and hyperparameter set in every space in
+    parallel and rank them by leave-one-patch-out deltaE 2000.
+
+    Parameters:
+    train_data (numpy array): (patches, 3) linear scanner RGB patch means,
+        e.g. from `calc_slide`.
+    reference_xyz (numpy array): (patches, 3) reference XYZ of the patches,
+        e.g. from `RawDataParser.get_reference_xyz`.
+    colourspace (str): RGB colourspace of `train_data` and of RGB models.
+    candidates (dict): name -> (regressor class, list of parameter dicts).
+    spaces (tuple): "RGB" and/or "XYZ", the space the models work in.
+    n_jobs (int): joblib workers, -1 for all cores.
+    cache_dir (str): Directory where the fitted models and their scores are
+        cached, keyed by a hash of the training data and the candidate.
+
+    Returns:
+    (AbstractRegressor, pandas DataFrame): The best model fitted on all
+    patches, and the scores of all candidates sorted by mean deltaE, with
+    their fitted models in the "model" column.
+    """
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+    data = (np.asarray(train_data), np.asarray(reference_xyz), colourspace)
+
+    jobs = [
+        joblib.delayed(_run_candidate)(
+            name, regressor_class, params, space, data, cache_dir
+        )
+        for name, (regressor_class, grid) in candidates.items()
+        for params in grid
+        for space in spaces
+    ]
+    results = joblib.Parallel(n_jobs=n_jobs)(jobs)
+
+    rows = [
+        {
+            "name": result["name"],
+            "space": result["space"],
+            "params": result["params"],
+            "mean_delta_E": float(np.mean(result["deltas"])),
+            "median_delta_E": float(np.median(result["deltas"])),
+            "max_delta_E": float(np.max(result["deltas"])),
+            "model": result["model"],
+        }
+        for result in results
+    ]
+    scores = pd.DataFrame(rows).sort_values("mean_delta_E", ignore_index=True)
+    return scores["model"][0], scores
@@ -1,11 +1,12 @@
 from sklearn.cross_decomposition import PLSRegression
-from colour_lib.regressors.AbstractRegressor import AbstractRegressor
+from colour_lib.regressors.LinearRegressor import LinearRegressor
 
 
-class PLSRegressor(AbstractRegressor):
+class PLSRegressor(LinearRegressor):
     def __init__(self, train_data, reference_data):
         self.reg = PLSRegression(n_components=train_data.shape[-1])
         self.reg.fit(train_data, reference_data)
+        self.fit_linear_map(train_data.shape[-1])
 
-    def predict(self, img):
-        return super().predict(img=img)
+    def predict(self, img, inplace=False, cctf_type=None):
+        return super().predict(img=img, inplace=inplace, cctf_type=cctf_type)
@@ -41,17 +41,14 @@ class StackedRegressor(AbstractRegressor):
             estimator.coef_ for estimator in self.meta_model.estimators_
         ]
 
-    def predict(self, img):
-        mod_img = img.copy()
-
-        for strip in mod_img:
-            # Генерируем предсказания базовых моделей для текущей полосы
-            meta_features = np.hstack(
-                [model.predict(strip) for name, model in self.base_models]
-            )
+    def predict_pixels(self, pixels):
+        # Генерируем предсказания базовых моделей для текущего блока пикселей
+        meta_features = np.hstack(
+            [model.predict(pixels) for name, model in self.base_models]
+        )
 
-            # Предсказываем результаты метамоделью
-            pred = self.meta_model.predict(meta_features)
-            strip[:, :] = np.clip(pred, 0, 1)
+        # Предсказываем результаты метамоделью
+        return self.meta_model.predict(meta_features)
 
-        return mod_img
+    def predict(self, img):
+        return super().predict(img=img)
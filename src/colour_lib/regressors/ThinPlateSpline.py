@@ -1,6 +1,5 @@
 from colour_lib.regressors.AbstractRegressor import AbstractRegressor
 from tps import ThinPlateSpline
-import numpy as np
 
 
 class TPSRegressor(AbstractRegressor):
@@ -11,11 +10,8 @@ class TPSRegressor(AbstractRegressor):
         # Fit the control and target points
         self.reg.fit(reference_data, train_data)
 
-    def predict(self, img):
-        mod_img = img.copy()
-
-        for i, strip in enumerate(mod_img):
-            strip = self.reg.transform(strip)
-            mod_img[i] = strip
+    def predict_pixels(self, pixels):
+        return self.reg.transform(pixels)
 
-        return np.clip(mod_img, 0, 1)
+    def predict(self, img):
+        return super().predict(img=img)
@@ -1,5 +1,8 @@
+from colour_lib.regressors.LinearRegressor import LinearRegressor
 from colour_lib.regressors.PLSregressor import PLSRegressor
 from colour_lib.regressors.LassoRegressor import LassoRegressor
 from colour_lib.regressors.StackedRegressor import StackedRegressor
 from colour_lib.regressors.ThinPlateSpline import TPSRegressor
 from colour_lib.regressors.VoteRegressor import VoteRegressor
+from colour_lib.regressors.LUTRegressor import LUTRegressor, bake_lut
+from colour_lib.regressors.ModelSelection import CANDIDATES, select_model
@@ -4,10 +4,19 @@ from colour.models.rgb.transfer_functions import gamma_function
 from functools import partial
 from typing import Literal
 
+import cv2
+import numpy as np
+
+from colour_lib.utils.instrumentation import count, span
+
 
 class CustomCCTF:
     MODE = Literal["encode", "decode"]
 
+    # (mode, cctf_type, input dtype, output dtype) -> (channels, values) table,
+    # shared by all instances like the colour CCTF registries
+    _luts = {}
+
     def __init__(self):
         self.TF = transfer_functions
         CUSTOM_DECODINGS: CanonicalMapping = CanonicalMapping(
@@ -44,8 +53,68 @@ class CustomCCTF:
             CanonicalMapping({name: partial(gamma_function, exponent=exponent)})
         )
         self.TF.CCTF_ENCODINGS.update(
-            CanonicalMapping({name: partial(gamma_function, exponent=1/exponent)})
+            CanonicalMapping(
+                {name: partial(gamma_function, exponent=1 / np.asarray(exponent))}
+            )
         )
+        self._luts.clear()
+
+    def apply_CCTF(self, mode: MODE, cctf_type: str, image, dtype=None):
+        # colour computes in float64, `dtype` only sets the returned dtype
+        with span("apply_CCTF", mode=mode, cctf_type=cctf_type):
+            image = self.functions[mode](value=image, function=cctf_type)
+        return image if dtype is None else image.astype(dtype, copy=False)
+
+    def lut(self, mode: MODE, cctf_type: str, dtype, out_dtype=np.float64):
+        """
+        Table of the CCTF for every value of an integer dtype, normalised by
+        its maximum (255 for the uint8 levels of `image_read`). Built once per
+        coding and cached.
+
+        Returns:
+        numpy array: (3, values) table, one row per channel.
+        """
+        key = (mode, cctf_type, np.dtype(dtype), np.dtype(out_dtype))
+        if key in self._luts:
+            count("cctf_lut_cache_hits")
+        else:
+            count("cctf_lut_cache_misses")
+            max_value = np.iinfo(dtype).max
+            values = np.arange(max_value + 1) / max_value
+            table = self.apply_CCTF(
+                mode=mode, cctf_type=cctf_type, image=np.repeat(values[:, None], 3, 1)
+            )
+            self._luts[key] = np.ascontiguousarray(table.T, dtype=out_dtype)
+        return self._luts[key]
+
+    def apply_CCTF_integer(
+        self, mode: MODE, cctf_type: str, image, out_dtype=np.float64
+    ):
+        """
+        Same as `apply_CCTF(image / max_value)` for uint8 and uint16 RGB images,
+        but looks the values up in a cached table instead of computing the
+        CCTF for every pixel.
+
+        Parameters:
+        image (numpy array): (..., 3) integer image.
+        out_dtype: float64 or float32.
 
-    def apply_CCTF(self, mode: MODE, cctf_type: str, image):
-        return self.functions[mode](value=image, function=cctf_type)
+        Returns:
+        numpy array: The image in [0, 1] with the CCTF applied.
+        """
+        if image.ndim < 2 or image.shape[-1] != 3:
+            raise ValueError(
+                f"apply_CCTF_integer expects a (..., 3) RGB image, got {image.shape}"
+            )
+        table = self.lut(mode, cctf_type, image.dtype, out_dtype)
+        count("cctf_lut_pixels", image.size // image.shape[-1])
+        with span("apply_CCTF_integer", mode=mode, cctf_type=cctf_type):
+            if image.dtype == np.uint8:
+                # cv2.LUT wants an (h, w, 3) image and a (256, 1, 3) table
+                pixels = np.ascontiguousarray(image).reshape(-1, 1, 3)
+                out = cv2.LUT(pixels, np.ascontiguousarray(table.T[:, None]))
+                return out.reshape(image.shape)
+            out = np.empty(image.shape, dtype=out_dtype)
+            for c in range(image.shape[-1]):
+                out[..., c] = table[c][image[..., c]]
+            return out
@@ -1,30 +1,144 @@
 import numpy as np
+import pandas as pd
 from colour import XYZ_to_Lab, delta_E
-import tifffile
-import zarr
-from colour_lib.utils.CustomCCTF import CustomCCTF
+from colour.models.rgb import RGB_COLOURSPACES
 
 from colour_lib.utils.rawparser import RawDataParser
 from colour_lib.utils.circlelib import *
 from colour_lib.utils.CustomCCTF import CustomCCTF
+from colour_lib.utils.tiles import apply_tiled, open_level, open_pyramid
+from colour_lib.utils.slidewriter import TiledSlideWriter
+from colour_lib.utils.region import (
+    RegionView,
+    pyramid_levels,
+    scale_region,
+    select_level,
+)
+from colour_lib.utils.instrumentation import span
 
 CCTF = CustomCCTF()
 
+# order of the calibration patches in `calc_slide` tables and reference charts
+PATCH_NAMES = ["CA"] + [f"{row}{col}" for row in "ABCD" for col in range(1, 7)]
+
+
+def image_read(
+    img,
+    level,
+    type,
+    dtype=np.float64,
+    region=None,
+    region_level=None,
+    flip=None,
+    target_size=None,
+    lazy=False,
+):
+    """
+    Read a pyramid level and decode it with the `type` CCTF to linear [0, 1].
+
+    Parameters:
+    img (str): Path to the pyramidal TIFF.
+    level (int): Pyramid level, or None to pick it from `target_size`.
+    type (str): CCTF of the scanner, e.g. "Gamma 1.8".
+    dtype: Output dtype, np.float32 halves the memory of the decoded image.
+    region (tuple): (y slice, x slice) to read, in pixels of `region_level`
+        (defaults to `level`, or to 0 if the level is picked from
+        `target_size`). Only the TIFF tiles intersecting it are decoded.
+    flip (int or tuple): Axes to flip like `np.flip`, e.g. 1 for the
+        mirrored Huron palettes.
+    target_size (tuple): (h, w); with level=None the coarsest level on which
+        the region is at least this size is read.
+    lazy (bool): Return a `RegionView`, which reads and decodes only the
+        pixels it is indexed with, instead of an array.
+
+    Returns:
+    numpy array or RegionView: The decoded (h, w, 3) image.
+    """
+    levels = pyramid_levels(open_pyramid(img))
+    if level is None:
+        if target_size is None:
+            raise ValueError("image_read needs a level or a target_size")
+        region_level = 0 if region_level is None else region_level
+        level = select_level(levels, target_size, region, region_level)
+    if region is not None and region_level is not None and region_level != level:
+        region = scale_region(region, levels[region_level].shape, levels[level].shape)
+
+    view = RegionView(
+        levels[level], region, flip=flip, cctf_type=type, dtype=dtype, cctf=CCTF
+    )
+    if lazy:
+        return view
+    with span("image_read", level=level):
+        return view[...]
+
+
+def rgb_to_xyz(image, colourspace="sRGB", dtype=None):
+    """
+    Convert linear RGB to XYZ with the colourspace matrix, like
+    `colour.RGB_to_XYZ` without chromatic adaptation, in `dtype` (defaults to
+    the image dtype for float images, float64 otherwise).
+    """
+    return _apply_matrix(image, RGB_COLOURSPACES[colourspace].matrix_RGB_to_XYZ, dtype)
+
 
-def image_read(img, level, type):
-    store = tifffile.imread(img, aszarr=True)
-    zarr_pyramids = zarr.open(store, mode="r")
-    image = np.array(zarr_pyramids[level]) / 255
-    image_revert = CCTF.apply_CCTF(mode="decode", cctf_type=type, image=image)
-    return image_revert
+def xyz_to_rgb(image, colourspace="sRGB", dtype=None):
+    # inverse of `rgb_to_xyz`, linear RGB without clipping
+    return _apply_matrix(image, RGB_COLOURSPACES[colourspace].matrix_XYZ_to_RGB, dtype)
+
+
+def _apply_matrix(image, matrix, dtype):
+    image = np.asarray(image)
+    if dtype is None:
+        floating = np.issubdtype(image.dtype, np.floating)
+        dtype = image.dtype if floating else np.float64
+    return image.astype(dtype, copy=False) @ matrix.T.astype(dtype)
 
 
 def calculate_delta_E(observe, reference):
     observe = XYZ_to_Lab(observe)
     reference = XYZ_to_Lab(reference)
-    deltas = np.zeros((observe.shape[0], 1))
-    for i in range(observe.shape[0]):
-        a = reference[i, :]
-        b = observe[i, :]
-        deltas[i] = delta_E(a, b, method="CIE 2000")
-    return deltas
+    deltas = delta_E(reference, observe, method="CIE 2000")
+    return deltas[..., np.newaxis]
+
+
+def batch_delta_E(observe, reference, models=None, slides=None, patches=PATCH_NAMES):
+    """
+    Compute deltaE 2000 for many models and slides in one vectorized pass.
+
+    Parameters:
+    observe (numpy array): XYZ values of shape (models, slides, patches, 3).
+    reference (numpy array): Reference XYZ values broadcastable to `observe`,
+        e.g. (patches, 3) or (slides, patches, 3).
+    models (list): Model labels, defaults to 0..models-1.
+    slides (list): Slide labels, defaults to 0..slides-1.
+    patches (list): Patch labels, defaults to PATCH_NAMES (CA, A1, ..., D6).
+
+    Returns:
+    (pandas DataFrame, pandas DataFrame): deltaE per (model, slide) row and patch
+    column, and its mean/median/p95/max summary per (model, slide).
+    """
+    observe = np.asarray(observe)
+    reference = np.broadcast_to(reference, observe.shape)
+    n_models, n_slides, n_patches = observe.shape[:3]
+
+    deltas = calculate_delta_E(observe, reference)[..., 0]
+
+    index = pd.MultiIndex.from_product(
+        [
+            range(n_models) if models is None else models,
+            range(n_slides) if slides is None else slides,
+        ],
+        names=["model", "slide"],
+    )
+    deltas = pd.DataFrame(
+        deltas.reshape(-1, n_patches), index=index, columns=patches[:n_patches]
+    )
+    summary = pd.DataFrame(
+        {
+            "mean": deltas.mean(axis=1),
+            "median": deltas.median(axis=1),
+            "p95": deltas.quantile(0.95, axis=1),
+            "max": deltas.max(axis=1),
+        }
+    )
+    return deltas, summary
@@ -1,6 +1,12 @@
+from functools import lru_cache
+
 import numpy as np
 import matplotlib.pyplot as plt
 
+from colour_lib.utils.instrumentation import count, traced
+
+STATISTICS = {"mean": np.mean, "std": np.std, "median": np.median}
+
 
 def draw_circle_mask(image, coord, radius):
     mask_shape = image.shape
@@ -28,19 +34,80 @@ def create_circle_mask(image, centroids, radius):
     return circle_mask
 
 
+def _disk(radius, dy, dx):
+    # boolean disk centred at (r + dy, r + dx) of a (2r + 1, 2r + 1) window
+    r = int(np.ceil(radius)) + 1
+    coords_y, coords_x = np.ogrid[-r : r + 1, -r : r + 1]
+    return (coords_y - dy) ** 2 + (coords_x - dx) ** 2 <= radius**2
+
+
+@lru_cache(maxsize=256)
+def disk_stencil(radius):
+    # disk centred on a pixel, shared by all circles of the same radius
+    stencil = _disk(radius, 0.0, 0.0)
+    stencil.setflags(write=False)
+    return stencil
+
+
+def circle_pixels(image, y, x, radius):
+    # (n, channels) array of the pixels inside the circle; only the circle's
+    # bounding box is read, so `image` may also be a lazily decoded zarr array
+    iy, ix = int(np.floor(y)), int(np.floor(x))
+    if y == iy and x == ix:
+        stencil = disk_stencil(float(radius))
+    else:
+        # sub-pixel centres get an exact mask, built per call
+        stencil = _disk(float(radius), y - iy, x - ix)
+    r = stencil.shape[0] // 2
+
+    y0, x0 = max(iy - r, 0), max(ix - r, 0)
+    y1, x1 = min(iy + r + 1, image.shape[0]), min(ix + r + 1, image.shape[1])
+    if y0 >= y1 or x0 >= x1:
+        return np.empty((0,) + tuple(image.shape[2:]), dtype=image.dtype)
+
+    window = np.asarray(image[y0:y1, x0:x1])
+    count("zarr_bytes_read", window.nbytes)
+    mask = stencil[y0 - iy + r : y1 - iy + r, x0 - ix + r : x1 - ix + r]
+    return window[mask]
+
+
+@traced("patch_statistics")
+def patch_statistics(image, coord, radius, statistics=("mean",), percentiles=()):
+    """
+    Compute per-channel statistics of every circle in one pass over `coord`,
+    touching only each circle's bounding box.
+
+    Parameters:
+    image (numpy array): Image of shape (h, w, channels).
+    coord (pandas DataFrame): Circle centres in "Y" and "X" columns.
+    radius (float): Circle radius in pixels.
+    statistics (tuple): Names from STATISTICS ("mean", "std", "median").
+    percentiles (tuple): Percentiles to compute, stored as "p<q>" keys.
+
+    Returns:
+    dict: Statistic name to (circles, channels) array. Circles without any
+    pixel inside the image are left at 0.
+    """
+    names = list(statistics) + [f"p{q:g}" for q in percentiles]
+    result = {name: np.zeros((len(coord), image.shape[2])) for name in names}
+
+    for i, (y, x) in enumerate(coord[["Y", "X"]].to_numpy()):
+        pixels = circle_pixels(image, y, x, radius)
+        if len(pixels) == 0:
+            continue
+        for name in statistics:
+            result[name][i] = STATISTICS[name](pixels, axis=0)
+        if len(percentiles):
+            values = np.percentile(pixels, percentiles, axis=0)
+            for q, value in zip(percentiles, values):
+                result[f"p{q:g}"][i] = value
+
+    return result
+
+
 def calc_rectangle(image, coord, radius):
     # create an array of mean values of one set of circles from A1 to D6
-    mean_values = []
-    for idx, centroids in coord.iterrows():
-        circle = create_circle_mask(image, centroids, radius)
-        masked_image = image * circle
-        mean_in_circle = []
-        for i in range(image.shape[2]):
-            channel_values = masked_image[:, :, i][masked_image[:, :, i] != 0]
-            mean_in_circle.append(channel_values.mean())
-        mean_in_circle = np.nan_to_num(mean_in_circle)  # Replace NaN with 0
-        mean_values.append(mean_in_circle.tolist())
-    return np.array(mean_values)
+    return patch_statistics(image, coord, radius)["mean"]
 
 
 def calc_rectangles(image, coords, rads, zones):
@@ -0,0 +1,222 @@
+"""
+Lightweight timing spans and counters for the colour_lib hot paths.
+
+Instrumentation is disabled by default: `span` then returns a shared no-op
+context manager and `count` returns immediately, so the instrumented
+functions only pay for one attribute check. Enable it with `enable()`, or
+for a whole process by setting COLOUR_LIB_TRACE to the path of the Chrome
+trace (chrome://tracing, Perfetto) that is written at exit; a "{pid}" in the
+path is replaced by the process id, for runs with worker processes.
+
+    from colour_lib.utils import instrumentation
+
+    instrumentation.enable()
+    PaletteParser().parse(path, "huron")
+    instrumentation.export_chrome_trace("parse.json")
+    instrumentation.summary()  # total seconds and calls per span
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+
+# spans kept in memory, the oldest are dropped beyond it
+MAX_EVENTS = 1_000_000
+
+
+class _State:
+    enabled = False
+    start = time.perf_counter()
+    events = deque(maxlen=MAX_EVENTS)
+    counters = Counter()
+    lock = threading.Lock()
+
+
+_STATE = _State()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        # complete event of the Chrome trace format, times in microseconds
+        event = {
+            "name": self.name,
+            "ph": "X",
+            "ts": (self.start - _STATE.start) * 1e6,
+            "dur": (end - self.start) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if self.args:
+            event["args"] = self.args
+        _STATE.events.append(event)
+        return False
+
+
+def enable(reset=True):
+    if reset:
+        reset_records()
+    _STATE.enabled = True
+
+
+def disable():
+    _STATE.enabled = False
+
+
+def is_enabled():
+    return _STATE.enabled
+
+
+def reset_records():
+    with _STATE.lock:
+        _STATE.start = time.perf_counter()
+        _STATE.events = deque(maxlen=MAX_EVENTS)
+        _STATE.counters = Counter()
+
+
+def span(name, /, **args):
+    """
+    Context manager timing the enclosed block as `name`; keyword arguments
+    are stored with the event, e.g. span("image_read", level=2).
+    """
+    if not _STATE.enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name=None):
+    # decorator running the function inside a span, named after it by default
+    def decorator(function):
+        span_name = function.__qualname__ if name is None else name
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _STATE.enabled:
+                return function(*args, **kwargs)
+            with _Span(span_name, None):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name, value=1):
+    """
+    Add `value` to the counter `name`, e.g. "zarr_bytes_read" or
+    "<cache>_hits". "pixels_processed" is only counted by the tile loops of
+    `utils.tiles`, so that it is the throughput of a tiled pass; inner layers
+    use their own counters ("predict_pixels", "cctf_lut_pixels").
+    """
+    if not _STATE.enabled:
+        return
+    with _STATE.lock:
+        _STATE.counters[name] += value
+
+
+def counters():
+    with _STATE.lock:
+        return dict(_STATE.counters)
+
+
+def events():
+    return list(_STATE.events)
+
+
+def summary():
+    """
+    Returns:
+    dict: Span name -> {"calls", "seconds"}, summed over all recorded spans.
+    """
+    totals = {}
+    for event in events():
+        total = totals.setdefault(event["name"], {"calls": 0, "seconds": 0.0})
+        total["calls"] += 1
+        total["seconds"] += event["dur"] / 1e6
+    return totals
+
+
+def export_chrome_trace(path):
+    # spans as complete events, counters as one counter event at the end
+    trace = events()
+    end = max((event["ts"] + event["dur"] for event in trace), default=0)
+    for name, value in counters().items():
+        trace.append(
+            {
+                "name": name,
+                "ph": "C",
+                "ts": end,
+                "pid": os.getpid(),
+                "args": {name: value},
+            }
+        )
+    with open(path, "w") as file:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, file)
+    return path
+
+
+def export_json(path):
+    # summary and counters, for dashboards and per-slide reports
+    with open(path, "w") as file:
+        json.dump({"spans": summary(), "counters": counters()}, file, indent=1)
+    return path
+
+
+def drain():
+    """
+    Take the spans and counters recorded since the last call, e.g. in a pool
+    worker, to be passed to `merge` in the parent process.
+    """
+    with _STATE.lock:
+        records = {
+            "start": _STATE.start,
+            "events": list(_STATE.events),
+            "counters": dict(_STATE.counters),
+        }
+        _STATE.events.clear()
+        _STATE.counters.clear()
+    return records
+
+
+def merge(records):
+    # add records from `drain` of another process; perf_counter is a
+    # system-wide monotonic clock, so only the start offsets differ
+    offset = (records["start"] - _STATE.start) * 1e6
+    with _STATE.lock:
+        for event in records["events"]:
+            _STATE.events.append({**event, "ts": event["ts"] + offset})
+        _STATE.counters.update(records["counters"])
+
+
+def _export_at_exit(path):
+    export_chrome_trace(path.format(pid=os.getpid()))
+
+
+if os.environ.get("COLOUR_LIB_TRACE"):
+    enable()
+    atexit.register(_export_at_exit, os.environ["COLOUR_LIB_TRACE"])
@@ -1,5 +1,7 @@
 from functools import partial
+import hashlib
 import os.path
+import zipfile
 from typing import Literal
 
 import numpy as np
@@ -10,15 +12,26 @@ from colour import (
     SDS_ILLUMINANTS,
     MultiSpectralDistributions,
     SpectralShape,
+    XYZ_to_xy,
     gamma_function,
     msds_to_XYZ,
+    sd_to_XYZ,
 )
 from colour.models.rgb import RGB_COLOURSPACES, XYZ_to_RGB
 
+from colour_lib.utils.instrumentation import count, span
+
+# bump when the chart computation changes to invalidate cached charts
+CACHE_VERSION = 2
+
 
 class RawDataParser:
-    ILLUMINANT = Literal["D50", "D65"]
+    ILLUMINANT = Literal["A", "D50", "D55", "D65", "FL2", "FL7", "FL11"]
     COLSPACE = Literal["sRGB", "NTSC (1987)"]
+    OBSERVERS = {
+        "2": "CIE 1931 2 Degree Standard Observer",
+        "10": "CIE 1964 10 Degree Standard Observer",
+    }
 
     def __init__(
         self,
@@ -26,28 +39,75 @@ class RawDataParser:
         wl_min=340,
         wl_max=830,
         wl_step=5,
+        use_cache=True,
+        cache_dir=None,
     ):
+        """
+        Charts are computed on first request for any illuminant of
+        SDS_ILLUMINANTS, observer ("2" or "10" degree) and colourspace, and
+        memoized in `self.charts`.
+
+        Computed charts are also cached as .npz files in `cache_dir` (defaults
+        to `<reference_basepath>/.cache`), keyed on the csv content, the
+        wavelength range, the observer and the illuminant/colourspace of the
+        chart. Pass use_cache=False to always recompute them.
+        """
         self.reference_basepath = reference_basepath
+        self.use_cache = use_cache
+        self.cache_dir = (
+            os.path.join(reference_basepath, ".cache")
+            if cache_dir is None
+            else cache_dir
+        )
+        config_path = f"{reference_basepath}/wavelengths_{wl_step}nmstep.csv"
         self.ref_patch_order, self.msds = self.load_msds(
-            f"{reference_basepath}/wavelengths_{wl_step}nmstep.csv",
+            config_path,
             wl_min,
             wl_max,
             wl_step,
         )
-        self.charts = {
-            "D50": self.calculate_xyz_chart(
-                observer=MSDS_CMFS["CIE 1931 2 Degree Standard Observer"],
-                illuminant=SDS_ILLUMINANTS["D50"],
-            ),
-            "D65": self.calculate_xyz_chart(
-                observer=MSDS_CMFS["CIE 1931 2 Degree Standard Observer"],
-                illuminant=SDS_ILLUMINANTS["D65"],
-            ),
-        }
-        self.charts["sRGB"] = self.calculate_rgb_chart(self.charts["D65"], "sRGB")
-        self.charts["NTSC (1987)"] = self.calculate_rgb_chart(
-            self.charts["D65"], "NTSC (1987)"
-        )
+        with open(config_path, "rb") as csv_file:
+            self._cache_key = [
+                CACHE_VERSION,
+                hashlib.sha256(csv_file.read()).hexdigest(),
+                wl_min,
+                wl_max,
+                wl_step,
+            ]
+        self.charts = {}
+
+    def _chart(self, key, calculate):
+        key = tuple(key)
+        if key not in self.charts:
+            self.charts[key] = self._cached_chart(list(key), calculate)
+        return self.charts[key]
+
+    def _cached_chart(self, key, calculate):
+        if not self.use_cache:
+            return calculate()
+
+        digest = hashlib.sha256(repr(self._cache_key + key).encode()).hexdigest()
+        path = os.path.join(self.cache_dir, f"chart_{digest[:32]}.npz")
+        try:
+            with np.load(path) as cached:
+                chart = cached["chart"]
+            count("chart_cache_hits")
+            return chart
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            count("chart_cache_misses")
+
+        with span("calculate_chart", key=repr(key)):
+            chart = calculate()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to a unique file first so concurrent workers never read a
+            # partially written cache entry
+            tmp_path = f"{path[:-4]}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, chart=chart)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # read-only reference directory, keep the computed chart
+        return chart
 
     def load_msds(self, config_path, wl_min, wl_max, wl_step):
         wvl_df = pd.read_csv(config_path)
@@ -85,7 +145,21 @@ class RawDataParser:
         assert xyzs.max() < 1
         return xyzs
 
-    def calculate_rgb_chart(self, xyz_chart, colorspace: COLSPACE = "sRGB"):
+    def calculate_rgb_chart(
+        self,
+        xyz_chart,
+        colorspace: COLSPACE = "sRGB",
+        illuminant_XYZ=None,
+        chromatic_adaptation_transform="Bradford",
+    ):
+        """
+        Parameters:
+        xyz_chart (numpy array): XYZ values of the patches under the illuminant.
+        colorspace (str): Target RGB colourspace.
+        illuminant_XYZ (numpy array): XYZ of the illuminant white; the chart is
+            adapted from it to the colourspace white with
+            `chromatic_adaptation_transform`. None skips the adaptation.
+        """
         assert colorspace in ["sRGB", "NTSC (1987)", "DON RGB 4"]
 
         _colspace = RGB_COLOURSPACES[colorspace]
@@ -93,26 +167,51 @@ class RawDataParser:
             _colspace._cctf_decoding = partial(gamma_function, exponent=1.8)
             _colspace._cctf_encoding = partial(gamma_function, exponent=1 / 1.8)
 
-        ret = np.zeros_like(xyz_chart)
-        for idx, p in enumerate(xyz_chart):
-            ret[idx] = XYZ_to_RGB(
-                XYZ=p, colourspace=_colspace, apply_cctf_encoding=False
-            )
+        ret = XYZ_to_RGB(
+            XYZ=xyz_chart,
+            colourspace=_colspace,
+            illuminant=None if illuminant_XYZ is None else XYZ_to_xy(illuminant_XYZ),
+            chromatic_adaptation_transform=chromatic_adaptation_transform,
+            apply_cctf_encoding=False,
+        )
         ret = np.nan_to_num(ret)
         ret[ret < 0] = 0
         return ret
 
-    def get_reference_xyz(self, illuminant: ILLUMINANT = "D65"):
-        return self.charts[illuminant]
+    def get_reference_xyz(self, illuminant: ILLUMINANT = "D65", observer="2"):
+        observer = self.OBSERVERS.get(observer, observer)
+        return self._chart(
+            ["XYZ", illuminant, observer],
+            partial(
+                self.calculate_xyz_chart,
+                observer=MSDS_CMFS[observer],
+                illuminant=SDS_ILLUMINANTS[illuminant],
+            ),
+        )
 
-    def get_reference_rgb(self, colour_space: COLSPACE = "sRGB"):
-        return self.charts[colour_space]
+    def get_reference_rgb(
+        self,
+        colour_space: COLSPACE = "sRGB",
+        illuminant: ILLUMINANT = "D65",
+        observer="2",
+    ):
+        observer = self.OBSERVERS.get(observer, observer)
+        return self._chart(
+            ["RGB", colour_space, illuminant, observer],
+            lambda: self.calculate_rgb_chart(
+                self.get_reference_xyz(illuminant, observer),
+                colour_space,
+                illuminant_XYZ=sd_to_XYZ(
+                    SDS_ILLUMINANTS[illuminant], cmfs=MSDS_CMFS[observer]
+                ),
+            ),
+        )
 
     def save_xyz_values(self):
         np.savez(
             f"{self.reference_basepath}/xyz_values.npz",
-            D50=self.get_reference_d50(),
-            D65=self.get_reference_d65(),
+            D50=self.get_reference_xyz("D50"),
+            D65=self.get_reference_xyz("D65"),
         )
         print(
             f"generated D65 and D50 XYZ values for 2-degree observer, saved to {self.reference_basepath}/xyz_values.npz"
@@ -121,9 +220,9 @@ class RawDataParser:
     def save_rgb_values(self):
         np.savez(
             f"{self.reference_basepath}/rgb_values.npz",
-            sRGB=self.get_reference_srgbs(),
-            DON4=self.get_reference_don4s(),
-            NTSC=self.get_reference_ntscs(),
+            sRGB=self.get_reference_rgb("sRGB"),
+            DON4=self.get_reference_rgb("DON RGB 4"),
+            NTSC=self.get_reference_rgb("NTSC (1987)"),
         )
         print(
             f"generated sRGB, DON RGB 4 and NTSC values, saved to {self.reference_basepath}/rgb_values.npz"
@@ -0,0 +1,169 @@
+import math
+
+import numpy as np
+import zarr
+
+from colour_lib.utils.CustomCCTF import CustomCCTF
+from colour_lib.utils.instrumentation import count, span
+
+CCTF = CustomCCTF()
+
+
+def pyramid_levels(pyramid):
+    # levels of an `open_pyramid` result, single-level TIFFs open as an array
+    if isinstance(pyramid, zarr.Array):
+        return [pyramid]
+    return [pyramid[key] for key in sorted(pyramid.array_keys(), key=int)]
+
+
+def scale_region(region, from_shape, to_shape):
+    """
+    Scale (y slice, x slice) pixel bounds from a level of shape `from_shape` to
+    one of shape `to_shape`, rounding outwards so that the region is covered.
+    """
+    scaled = []
+    for s, n_from, n_to in zip(region, from_shape[:2], to_shape[:2]):
+        start, stop, _ = s.indices(n_from)
+        factor = n_to / n_from
+        scaled.append(
+            slice(
+                max(math.floor(start * factor), 0),
+                min(math.ceil(stop * factor), n_to),
+            )
+        )
+    return tuple(scaled)
+
+
+def select_level(levels, target_size, region=None, region_level=0):
+    """
+    Coarsest pyramid level on which `region` (full level if None, given in
+    pixels of `region_level`) is at least `target_size` = (h, w) pixels,
+    level 0 if none is.
+    """
+    reference = levels[region_level].shape
+    region = (slice(None), slice(None)) if region is None else region
+    for level in range(len(levels) - 1, 0, -1):
+        ys, xs = scale_region(region, reference, levels[level].shape)
+        if (
+            ys.stop - ys.start >= target_size[0]
+            and xs.stop - xs.start >= target_size[1]
+        ):
+            return level
+    return 0
+
+
+def _flip_axes(flip):
+    if flip is None:
+        return ()
+    return (flip,) if np.isscalar(flip) else tuple(flip)
+
+
+class RegionView:
+    """
+    Lazy (h, w, channels) view of a region of a pyramid level. Nothing is
+    read until the view is indexed or converted with `np.asarray`; then only
+    the TIFF tiles intersecting the requested pixels are decoded, and the CCTF
+    decode of `image_read` is applied to those pixels only.
+
+    Indices are in view coordinates, i.e. after cropping to the region and
+    flipping the axes in `flip` like `np.flip`. Integers, slices (with
+    positive or negative steps) and Ellipsis are supported. `cctf` is the
+    CustomCCTF instance used for decoding, e.g. `utils.CCTF`.
+    """
+
+    def __init__(
+        self, level, region=None, flip=None, cctf_type=None, dtype=np.float64, cctf=CCTF
+    ):
+        self.level = level
+        self.cctf = cctf
+        if region is None:
+            region = (slice(None), slice(None))
+        self.region = tuple(
+            slice(*s.indices(n)[:2]) for s, n in zip(region, level.shape)
+        )
+        for axis, s in enumerate(self.region):
+            if region[axis].step not in (None, 1) or s.start > s.stop:
+                raise ValueError(
+                    f"region {region[axis]} of axis {axis} is not an increasing "
+                    "range of pixels, use `flip` to reverse the axis"
+                )
+        self.flip = tuple(axis % 2 for axis in _flip_axes(flip))
+        self.cctf_type = cctf_type
+        self.dtype = np.dtype(level.dtype if cctf_type is None else dtype)
+        self.shape = tuple(s.stop - s.start for s in self.region) + level.shape[2:]
+        self.ndim = len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return (
+            f"RegionView(shape={self.shape}, dtype={self.dtype}, "
+            f"region={self.region}, flip={self.flip})"
+        )
+
+    def _source_slice(self, axis, key):
+        # view index or slice on `axis` -> source slice, whether to reverse the
+        # read pixels and whether to drop the axis
+        n = self.shape[axis]
+        if isinstance(key, slice):
+            indices = range(*key.indices(n))
+            drop = False
+        else:
+            index = int(key) + n if key < 0 else int(key)
+            if not 0 <= index < n:
+                raise IndexError(f"index {key} out of range for axis of size {n}")
+            indices = range(index, index + 1)
+            drop = True
+
+        offset = self.region[axis].start
+        if not len(indices):
+            return slice(offset, offset), False, drop
+        first, last, step = indices[0], indices[-1], indices.step
+        if axis in self.flip:
+            first, last, step = n - 1 - first, n - 1 - last, -step
+        if step > 0:
+            return slice(offset + first, offset + last + 1, step), False, drop
+        return slice(offset + last, offset + first + 1, -step), True, drop
+
+    def __getitem__(self, key):
+        key = key if isinstance(key, tuple) else (key,)
+        if any(k is Ellipsis for k in key):
+            i = key.index(Ellipsis)
+            key = key[:i] + (slice(None),) * (self.ndim - len(key) + 1) + key[i + 1 :]
+        key = key + (slice(None),) * (self.ndim - len(key))
+
+        (ys, flip_y, drop_y), (xs, flip_x, drop_x) = (
+            self._source_slice(axis, k) for axis, k in enumerate(key[:2])
+        )
+        with span("region_read"):
+            tile = np.asarray(self.level[ys, xs])
+        count("zarr_bytes_read", tile.nbytes)
+
+        if flip_y:
+            tile = tile[::-1]
+        if flip_x:
+            tile = tile[:, ::-1]
+        if self.cctf_type is not None:
+            tile = self._decode(tile)
+
+        tile = tile[(0 if drop_y else slice(None), 0 if drop_x else slice(None))]
+        return tile[(Ellipsis,) + key[2:]] if key[2:] else tile
+
+    def _decode(self, tile):
+        # values are scaled by 1 / 255 like in the original `image_read`, the
+        # table lookup gives the same result for uint8 RGB only
+        if tile.dtype == np.uint8 and tile.shape[-1:] == (3,) and tile.size:
+            return self.cctf.apply_CCTF_integer(
+                mode="decode",
+                cctf_type=self.cctf_type,
+                image=np.ascontiguousarray(tile),
+                out_dtype=self.dtype,
+            )
+        return self.cctf.apply_CCTF(
+            mode="decode", cctf_type=self.cctf_type, image=tile / 255, dtype=self.dtype
+        )
+
+    def __array__(self, dtype=None, copy=None):
+        image = self[...]
+        return image if dtype is None else image.astype(dtype, copy=False)
@@ -0,0 +1,301 @@
+"""
+Shared reader layer for pyramidal TIFFs.
+
+`open_pyramid` goes through the module-level `READERS` pool: the tifffile
+zarr store of a slide is created once per path and process, and decoded
+tiles of all slides and levels are kept in one byte-bounded LRU cache, so
+re-reading a region (e.g. the palette after detection) does not decode its
+JPEG/LZW tiles again. Tiles missing from the cache are decoded on a thread
+pool, imagecodecs releases the GIL.
+
+    from colour_lib.utils.slidereader import READERS
+
+    READERS.cache.max_bytes = 2 << 30  # 2 GiB of decoded tiles
+    READERS.decode_workers = 8
+
+The cache size defaults to COLOUR_LIB_TILE_CACHE_MB (128) megabytes. Single
+pass reads, such as the tile loops of `apply_tiled`, run inside
+`READERS.cache.bypass()` so that they do not evict the tiles worth keeping.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+import numpy as np
+import tifffile
+import zarr
+
+# zarr 2 store API, zarr is pinned below 3
+from zarr.storage import Store
+
+from colour_lib.utils.instrumentation import count
+
+
+class TileCache:
+    """
+    Thread-safe LRU cache of decoded tiles, bounded by the total number of
+    bytes of the cached arrays.
+    """
+
+    def __init__(self, max_bytes=128 << 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def bypass(self):
+        # tiles decoded by this thread in the block are not cached, cached
+        # tiles are still used
+        previous = getattr(self._local, "bypass", False)
+        self._local.bypass = True
+        try:
+            yield
+        finally:
+            self._local.bypass = previous
+
+    def bypassed(self):
+        return getattr(self._local, "bypass", False)
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def get(self, key):
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+        count("tile_cache_hits" if tile is not None else "tile_cache_misses")
+        return tile
+
+    def put(self, key, tile):
+        if tile.nbytes > self.max_bytes:
+            return
+        # cached tiles are shared by all readers
+        tile.setflags(write=False)
+        with self._lock:
+            old = self._tiles.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._tiles[key] = tile
+            self.nbytes += tile.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._tiles.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self, namespace=None):
+        # all tiles, or the tiles of one slide
+        with self._lock:
+            if namespace is None:
+                self._tiles.clear()
+                self.nbytes = 0
+                return
+            for key in [key for key in self._tiles if key[0] == namespace]:
+                self.nbytes -= self._tiles.pop(key).nbytes
+
+
+class CachedTiffStore(Store):
+    """
+    Read-only zarr store wrapping a tifffile `ZarrTiffStore`: chunks are
+    looked up in `cache` first, and `getitems` (used by zarr for every
+    selection) decodes the missing chunks concurrently on the thread pool
+    returned by `executor()`, or in the calling thread if it returns None.
+    """
+
+    _readable = True
+    _writeable = False
+    _erasable = False
+    _listable = True
+
+    def __init__(self, store, cache, namespace, executor=None):
+        self.store = store
+        self.cache = cache
+        self.namespace = namespace
+        self.executor = executor
+
+    @staticmethod
+    def _is_chunk(key):
+        # metadata keys are ".zarray", ".zattrs", "0/.zarray", ...
+        return not key.rsplit("/", 1)[-1].startswith(".")
+
+    def _decode(self, key, keep=True):
+        try:
+            tile = np.asarray(self.store[key])
+        except KeyError:
+            # tile not stored in the file, zarr uses the fill value
+            return None
+        if keep:
+            self.cache.put((self.namespace, key), tile)
+        return tile
+
+    def __getitem__(self, key):
+        if not self._is_chunk(key):
+            return self.store[key]
+        tile = self.cache.get((self.namespace, key))
+        if tile is None:
+            tile = self._decode(key, keep=not self.cache.bypassed())
+        if tile is None:
+            raise KeyError(key)
+        return tile
+
+    def getitems(self, keys, *, contexts=None):
+        tiles = {}
+        missing = []
+        for key in keys:
+            if not self._is_chunk(key):
+                if key in self.store:
+                    tiles[key] = self.store[key]
+                continue
+            tile = self.cache.get((self.namespace, key))
+            if tile is None:
+                missing.append(key)
+            else:
+                tiles[key] = tile
+
+        # decoding threads do not see the caller's bypass, pass it along
+        decode = partial(self._decode, keep=not self.cache.bypassed())
+        executor = None if self.executor is None else self.executor()
+        if executor is not None and len(missing) > 1:
+            decoded = executor.map(decode, missing)
+        else:
+            decoded = map(decode, missing)
+        for key, tile in zip(missing, decoded):
+            if tile is not None:
+                tiles[key] = tile
+        return tiles
+
+    def __contains__(self, key):
+        return key in self.store
+
+    def __iter__(self):
+        return iter(self.store)
+
+    def __len__(self):
+        return len(self.store)
+
+    def keys(self):
+        return self.store.keys()
+
+    def __setitem__(self, key, value):
+        raise PermissionError("CachedTiffStore is read-only")
+
+    def __delitem__(self, key):
+        raise PermissionError("CachedTiffStore is read-only")
+
+    def close(self):
+        self.store.close()
+
+
+class SlideReaderPool:
+    """
+    Pool of open slides keyed by path, sharing one `TileCache`. A slide is
+    reopened when its file changes (modification time or size), and at most
+    `max_open` slides are kept open, least recently used first out; arrays
+    returned earlier stay readable after their slide leaves the pool, tifffile
+    reopens the file on the next read.
+
+    Parameters:
+    max_open (int): Number of slides kept open.
+    cache_bytes (int): Size of the decoded tile cache in bytes, defaults to
+        COLOUR_LIB_TILE_CACHE_MB megabytes (128).
+    decode_workers (int): Threads decoding tiles concurrently, 1 to decode
+        in the calling thread.
+    """
+
+    def __init__(self, max_open=16, cache_bytes=None, decode_workers=4):
+        if cache_bytes is None:
+            cache_bytes = int(os.environ.get("COLOUR_LIB_TILE_CACHE_MB", 128)) << 20
+        self.max_open = max_open
+        self.cache = TileCache(cache_bytes)
+        self.decode_workers = decode_workers
+        self._slides = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_workers = None
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        # threads and cached handles do not survive a fork
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._slides = OrderedDict()
+            self._executor = None
+            self._executor_workers = None
+            self._lock = threading.Lock()
+            self.cache = TileCache(self.cache.max_bytes)
+
+    def executor(self):
+        # decode pool of all slides, resized when `decode_workers` changes
+        workers = self.decode_workers if self.decode_workers > 1 else None
+        with self._lock:
+            if workers != self._executor_workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = (
+                    ThreadPoolExecutor(workers, thread_name_prefix="colour_lib-decode")
+                    if workers
+                    else None
+                )
+                self._executor_workers = workers
+            return self._executor
+
+    def open(self, path):
+        """
+        Returns:
+        zarr group or array: The pyramid of `path`, levels as in
+        `open_pyramid`.
+        """
+        self._check_fork()
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._slides.get(path)
+            if entry is not None and entry[0] == version:
+                self._slides.move_to_end(path)
+                count("slide_pool_hits")
+                return entry[1]
+
+        count("slide_pool_misses")
+        store = tifffile.imread(path, aszarr=True)
+        namespace = (path, version)
+        cached = CachedTiffStore(store, self.cache, namespace, self.executor)
+        pyramid = zarr.open(cached, mode="r")
+
+        with self._lock:
+            old = self._slides.pop(path, None)
+            self._slides[path] = (version, pyramid, namespace, cached)
+            evicted = []
+            while len(self._slides) > self.max_open:
+                evicted.append(self._slides.popitem(last=False)[1])
+        if old is not None:
+            self.cache.clear(old[2])
+            old[3].close()
+        for entry in evicted:
+            entry[3].close()
+        return pyramid
+
+    def close(self, path=None):
+        # forget one slide (and its cached tiles) or all of them
+        self._check_fork()
+        with self._lock:
+            if path is None:
+                entries = list(self._slides.values())
+                self._slides.clear()
+            else:
+                entries = [self._slides.pop(os.path.abspath(path), None)]
+        if path is None:
+            self.cache.clear()
+        elif entries[0] is not None:
+            self.cache.clear(entries[0][2])
+        for entry in entries:
+            if entry is not None:
+                entry[3].close()
+
+
+READERS = SlideReaderPool()
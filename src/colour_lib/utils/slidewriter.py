@@ -0,0 +1,359 @@
+"""
+Tiled pyramidal writer for corrected slides.
+
+    with TiledSlideWriter("corrected.ome.tif", level.shape, np.uint8) as writer:
+        regressor.predict_tiled(level, writer, "Gamma 1.8")
+
+`apply_tiled` (and so `predict_tiled` and `match_histograms_tiled`) uses it
+for output paths, so any correction can be written this way.
+"""
+
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import tifffile
+import zarr
+from numcodecs import Blosc
+
+from colour_lib.utils.instrumentation import count, span
+
+_END = object()
+
+
+def _tile_shape(tile_size):
+    return (tile_size, tile_size) if np.isscalar(tile_size) else tuple(tile_size)
+
+
+def pyramid_shapes(shape, tile_size, levels=None):
+    """
+    (h, w) of the levels written by `TiledSlideWriter`, each level halving the
+    previous one, rounded up. By default levels are added until the smallest
+    one fits in a tile, as long as the tile size stays divisible by the
+    downsampling factor, so that levels can be built tile by tile.
+    """
+    th, tw = _tile_shape(tile_size)
+    h, w = shape[:2]
+    if levels is None:
+        levels = 1
+        while (h > th or w > tw) and not (th | tw) & ((1 << levels) - 1):
+            h, w = -(-h // 2), -(-w // 2)
+            levels += 1
+    elif (th | tw) & ((1 << (levels - 1)) - 1):
+        raise ValueError(
+            f"tile size {(th, tw)} is not divisible by 2**{levels - 1} "
+            f"for {levels} levels"
+        )
+
+    shapes = [tuple(shape[:2])]
+    for _ in range(levels - 1):
+        h, w = shapes[-1]
+        shapes.append((-(-h // 2), -(-w // 2)))
+    return shapes
+
+
+def _downsample(block):
+    # 2x2 mean, odd edge blocks are padded by repeating their last row/column
+    h, w = -(-block.shape[0] // 2), -(-block.shape[1] // 2)
+    if block.shape[0] % 2 or block.shape[1] % 2:
+        pad = ((0, block.shape[0] % 2), (0, block.shape[1] % 2))
+        block = np.pad(block, pad + ((0, 0),) * (block.ndim - 2), mode="edge")
+    small = cv2.resize(block, (w, h), interpolation=cv2.INTER_AREA)
+    return small.reshape((h, w) + block.shape[2:])
+
+
+def _level_tiles(level, tile_size):
+    th, tw = tile_size
+    for y in range(0, level.shape[0], th):
+        for x in range(0, level.shape[1], tw):
+            yield np.asarray(level[y : y + th, x : x + tw])
+
+
+class TiledSlideWriter:
+    """
+    Writes a slide tile by tile as a tiled pyramidal (OME-)TIFF, or as a zarr
+    group with one array per level if `path` ends in ".zarr". The downsampled
+    levels are built from the tiles as they are assigned, and tiles are
+    compressed on `workers` threads.
+
+    Tiles must be assigned in row-major order on the `tile_size` grid, as
+    `apply_tiled` produces them: writer[ys, xs] = tile. Memory is bounded by
+    one strip of tile rows per downsampled level and a few tiles waiting for
+    compression. Level 0 of a TIFF is streamed to the file; the other levels
+    are staged in a temporary zarr next to it and written as SubIFDs on
+    `close`.
+
+    Parameters:
+    path (str): Output path, TIFF (OME-TIFF for ".ome.tif") or ".zarr".
+    shape (tuple): (h, w, channels) of level 0.
+    dtype: Output dtype.
+    tile_size (int or tuple): Tile height and width, multiples of 16 for TIFF.
+    levels (int): Number of pyramid levels, see `pyramid_shapes`.
+    compression: tifffile compression of TIFF tiles, e.g. "zlib" (default),
+        "jpeg" (uint8 only) or "zstd"; numcodecs codec of zarr chunks, Blosc
+        zstd by default.
+    compression_level (int): Compression level, or quality for JPEG.
+    workers (int): Compression threads, None for all cores. Use 1 when the
+        tiles come from a process pool already using the cores.
+    """
+
+    def __init__(
+        self,
+        path,
+        shape,
+        dtype,
+        tile_size=1024,
+        levels=None,
+        compression=None,
+        compression_level=None,
+        workers=None,
+    ):
+        self.path = path
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.tile_size = _tile_shape(tile_size)
+        self.is_zarr = path.rstrip("/").endswith(".zarr")
+        if not self.is_zarr and any(n % 16 for n in self.tile_size):
+            raise ValueError(
+                f"tile size {self.tile_size} of TIFF output must be a multiple " "of 16"
+            )
+        self.level_shapes = pyramid_shapes(shape, tile_size, levels)
+        self.workers = os.cpu_count() if workers is None else workers
+
+        th, tw = self.tile_size
+        self._rows = -(-self.shape[0] // th)
+        self._cols = -(-self.shape[1] // tw)
+        self._n_tiles = self._rows * self._cols
+        self._next = 0
+        self._flushed = [0] * len(self.level_shapes)
+        self._strips = [None] + [self._new_strip(k) for k in self._level_range()]
+        self._pool = ThreadPoolExecutor(self.workers)
+        self._pending = deque()
+        self._closed = False
+
+        if self.is_zarr:
+            compressor = (
+                Blosc("zstd", compression_level or 5, Blosc.BITSHUFFLE)
+                if compression is None
+                else compression
+            )
+            self._root = zarr.open_group(path, mode="w")
+            self._levels = [
+                self._create_level(self._root, k, compressor)
+                for k in range(len(self.level_shapes))
+            ]
+            return
+
+        self._options = {
+            "dtype": self.dtype,
+            "tile": self.tile_size,
+            "photometric": "rgb" if self.shape[2:] == (3,) else "minisblack",
+            "compression": "zlib" if compression is None else compression,
+            "maxworkers": self.workers,
+        }
+        if compression_level is not None:
+            self._options["compressionargs"] = {"level": compression_level}
+
+        # downsampled levels are staged until level 0 is written
+        self._staging = tempfile.mkdtemp(
+            suffix=".zarr", dir=os.path.dirname(os.path.abspath(path))
+        )
+        staging = zarr.open_group(self._staging, mode="w")
+        self._levels = [None] + [
+            self._create_level(staging, k, Blosc("lz4", 1)) for k in self._level_range()
+        ]
+        self._queue = queue.Queue(maxsize=2 * self.workers)
+        self._error = None
+        self._ended = False
+        self._thread = threading.Thread(target=self._write_tiff, daemon=True)
+        self._thread.start()
+
+    def _level_range(self):
+        return range(1, len(self.level_shapes))
+
+    def _new_strip(self, k):
+        # tile rows of level k waiting to be written, one tile height tall
+        return np.empty(
+            (self.tile_size[0], self.level_shapes[k][1]) + self.shape[2:], self.dtype
+        )
+
+    def _create_level(self, group, k, compressor):
+        return group.create_dataset(
+            str(k),
+            shape=self.level_shapes[k] + self.shape[2:],
+            chunks=self.tile_size + self.shape[2:],
+            dtype=self.dtype,
+            compressor=compressor,
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _submit(self, level, ys, xs, block):
+        # bounded number of blocks in flight, the oldest is waited for first
+        while len(self._pending) >= 2 * self.workers:
+            self._pending.popleft().result()
+        self._pending.append(self._pool.submit(level.__setitem__, (ys, xs), block))
+
+    def _put(self, tile):
+        while True:
+            try:
+                self._queue.put(tile, timeout=0.1)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    raise RuntimeError(f"writing {self.path} failed") from self._error
+
+    def __setitem__(self, key, tile):
+        ys, xs = key[:2]
+        th, tw = self.tile_size
+        row, col = divmod(self._next, self._cols)
+        if self._next >= self._n_tiles or (ys.start, xs.start) != (row * th, col * tw):
+            raise ValueError(
+                f"tile at ({ys.start}, {xs.start}): tiles must be assigned in "
+                f"row-major order on the {self.tile_size} grid"
+            )
+        tile = np.asarray(tile, dtype=self.dtype)
+        count("tiles_written")
+
+        if self.is_zarr:
+            self._submit(self._levels[0], ys, xs, tile)
+        else:
+            self._put(tile)
+
+        block = tile
+        for k in self._level_range():
+            block = _downsample(block)
+            y, x = (ys.start >> k) - self._flushed[k], xs.start >> k
+            self._strips[k][y : y + block.shape[0], x : x + block.shape[1]] = block
+
+        self._next += 1
+        if col == self._cols - 1:
+            self._flush_strips(last=row == self._rows - 1, stop=ys.stop)
+
+    def _flush_strips(self, last, stop):
+        for k in self._level_range():
+            end = self.level_shapes[k][0] if last else stop >> k
+            if end - self._flushed[k] < self.tile_size[0] and not last:
+                continue
+            strip = self._strips[k][: end - self._flushed[k]]
+            self._submit(
+                self._levels[k], slice(self._flushed[k], end), slice(None), strip
+            )
+            # the submitted strip is owned by the pool until written
+            self._strips[k] = self._new_strip(k)
+            self._flushed[k] = end
+
+    def _queued_tiles(self):
+        while True:
+            tile = self._queue.get()
+            if tile is _END:
+                self._ended = True
+                return
+            yield tile
+
+    def _write_tiff(self):
+        try:
+            ome = self.path.lower().endswith((".ome.tif", ".ome.tiff"))
+            with tifffile.TiffWriter(self.path, bigtiff=True, ome=ome) as tiff:
+                tiff.write(
+                    data=self._queued_tiles(),
+                    shape=self.shape,
+                    subifds=len(self.level_shapes) - 1,
+                    **self._options,
+                )
+                # the levels are complete once level 0 has been received
+                for level in self._levels[1:]:
+                    tiff.write(
+                        data=_level_tiles(level, self.tile_size),
+                        shape=level.shape,
+                        subfiletype=1,
+                        **self._options,
+                    )
+        except BaseException as error:
+            self._error = error
+            # let the producer finish instead of blocking on a full queue
+            while not self._ended:
+                self._ended = self._queue.get() is _END
+
+    def close(self):
+        """
+        Wait for all tiles to be written and finish the file. Raises if not
+        all tiles were assigned.
+        """
+        if self._closed:
+            return
+        if self._next != self._n_tiles:
+            self.abort()
+            raise ValueError(
+                f"{self.path}: {self._next} of {self._n_tiles} tiles were written"
+            )
+        with span("TiledSlideWriter.close"):
+            try:
+                while self._pending:
+                    self._pending.popleft().result()
+                self._pool.shutdown()
+                if self.is_zarr:
+                    self._write_multiscales()
+                else:
+                    self._put(_END)
+                    self._thread.join()
+                    if self._error is not None:
+                        raise RuntimeError(
+                            f"writing {self.path} failed"
+                        ) from self._error
+            finally:
+                self._closed = True
+                if not self.is_zarr:
+                    shutil.rmtree(self._staging, ignore_errors=True)
+
+    def abort(self):
+        # stop writing, the partial output is left as is
+        if self._closed:
+            return
+        self._closed = True
+        for future in self._pending:
+            future.cancel()
+        self._pool.shutdown()
+        if not self.is_zarr:
+            self._queue.put(_END)
+            self._thread.join()
+            shutil.rmtree(self._staging, ignore_errors=True)
+
+    def _write_multiscales(self):
+        # OME-NGFF style metadata, so that viewers find the levels
+        axes = [{"name": "y", "type": "space"}, {"name": "x", "type": "space"}]
+        if len(self.shape) == 3:
+            axes.append({"name": "c", "type": "channel"})
+        self._root.attrs["multiscales"] = [
+            {
+                "version": "0.4",
+                "axes": axes,
+                "datasets": [
+                    {
+                        "path": str(k),
+                        "coordinateTransformations": [
+                            {
+                                "type": "scale",
+                                "scale": [2.0**k, 2.0**k]
+                                + [1.0] * (len(self.shape) - 2),
+                            }
+                        ],
+                    }
+                    for k in range(len(self.level_shapes))
+                ],
+            }
+        ]
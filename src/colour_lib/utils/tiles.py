@@ -0,0 +1,258 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import zarr
+from threadpoolctl import threadpool_limits
+
+from colour_lib.utils.CustomCCTF import CustomCCTF
+from colour_lib.utils import instrumentation
+from colour_lib.utils.instrumentation import count, span, traced
+from colour_lib.utils.slidereader import READERS
+from colour_lib.utils.slidewriter import TiledSlideWriter
+
+CCTF = CustomCCTF()
+
+
+@traced("open_pyramid")
+def open_pyramid(path):
+    if os.path.isdir(path):
+        # zarr written by TiledSlideWriter
+        return zarr.open(path, mode="r")
+    # shared handle and decoded tile cache, see utils.slidereader
+    return READERS.open(path)
+
+
+def open_level(path, level):
+    return open_pyramid(path)[level]
+
+
+def tile_slices(shape, tile_size):
+    # row-major (y, x) slices covering the first two axes of `shape`
+    th, tw = (tile_size, tile_size) if np.isscalar(tile_size) else tile_size
+    for y in range(0, shape[0], th):
+        for x in range(0, shape[1], tw):
+            yield slice(y, min(y + th, shape[0])), slice(x, min(x + tw, shape[1]))
+
+
+class TileCorrection:
+    """
+    Wraps a correction working on decoded [0, 1] images so that it can be
+    applied to raw scanner tiles.
+
+    If `cctf_type` is None, tiles are passed through unchanged and the result is
+    only cast to `dtype`. Otherwise integer tiles are normalised by the maximum
+    of their dtype and decoded, and integer outputs are encoded back with the
+    same CCTF and quantised.
+    """
+
+    def __init__(self, correction, cctf_type=None, dtype=None):
+        self.correction = correction
+        self.cctf_type = cctf_type
+        self.dtype = None if dtype is None else np.dtype(dtype)
+
+    def __call__(self, tile):
+        dtype = tile.dtype if self.dtype is None else self.dtype
+        if self.cctf_type is None:
+            return np.asarray(self.correction(tile)).astype(dtype, copy=False)
+
+        if np.issubdtype(tile.dtype, np.integer) and tile.shape[-1:] == (3,):
+            image = CCTF.apply_CCTF_integer(
+                mode="decode", cctf_type=self.cctf_type, image=tile
+            )
+        elif np.issubdtype(tile.dtype, np.integer):
+            image = CCTF.apply_CCTF(
+                mode="decode",
+                cctf_type=self.cctf_type,
+                image=tile / np.iinfo(tile.dtype).max,
+            )
+        else:
+            image = CCTF.apply_CCTF(mode="decode", cctf_type=self.cctf_type, image=tile)
+        corrected = self.correction(image)
+
+        if np.issubdtype(dtype, np.integer):
+            encoded = CCTF.apply_CCTF(
+                mode="encode", cctf_type=self.cctf_type, image=corrected
+            )
+            max_value = np.iinfo(dtype).max
+            return np.clip(np.rint(encoded * max_value), 0, max_value).astype(dtype)
+        return np.asarray(corrected).astype(dtype, copy=False)
+
+
+def iter_corrected(correction, source, tile_size=1024):
+    for ys, xs in tile_slices(source.shape, tile_size):
+        with span("read_tile"), READERS.cache.bypass():
+            tile = np.asarray(source[ys, xs])
+        count("zarr_bytes_read", tile.nbytes)
+        count("pixels_processed", tile.shape[0] * tile.shape[1])
+        with span("correct_tile"):
+            corrected = correction(tile)
+        yield ys, xs, corrected
+
+
+# per-process state of the pool workers, set up once by `_init_worker`
+_WORKER = {}
+
+
+def _init_worker(correction, names, shapes, dtypes, tracing=False):
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    _WORKER["blocks"] = blocks
+    _WORKER["inputs"], _WORKER["outputs"] = [
+        np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        for block, shape, dtype in zip(blocks, shapes, dtypes)
+    ]
+    _WORKER["correction"] = correction
+    # forked workers inherit the parent's records, their own spans are sent
+    # back with each tile
+    _WORKER["tracing"] = tracing
+    if tracing:
+        instrumentation.enable(reset=True)
+    else:
+        instrumentation.disable()
+        instrumentation.reset_records()
+    # one BLAS/OpenMP thread per worker, the pool provides the parallelism
+    threadpool_limits(limits=1)
+
+
+def _correct_slot(slot, h, w):
+    tile = _WORKER["inputs"][slot, :h, :w]
+    with span("correct_tile"):
+        _WORKER["outputs"][slot, :h, :w] = _WORKER["correction"](tile)
+    return slot, instrumentation.drain() if _WORKER["tracing"] else None
+
+
+def iter_corrected_parallel(correction, source, dtype, tile_size=1024, workers=None):
+    """
+    Same as `iter_corrected`, but tiles are corrected in a process pool.
+
+    Tiles are read and decoded on `workers` threads of this process and
+    exchanged with the workers through a ring of shared memory slots (two per
+    worker) instead of being pickled. They are yielded in row-major order, so
+    at most 2 * workers tiles are in flight.
+    """
+    workers = os.cpu_count() if workers is None else workers
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+    th, tw = (tile_size, tile_size) if np.isscalar(tile_size) else tile_size
+    n_slots = 2 * workers
+    shapes = [(n_slots, th, tw) + tuple(source.shape[2:])] * 2
+    dtypes = [np.dtype(source.dtype), np.dtype(dtype)]
+
+    blocks = [
+        shared_memory.SharedMemory(
+            create=True, size=max(1, int(np.prod(shape)) * dt.itemsize)
+        )
+        for shape, dt in zip(shapes, dtypes)
+    ]
+    inputs = outputs = None
+    try:
+        inputs, outputs = [
+            np.ndarray(shape, dtype=dt, buffer=block.buf)
+            for block, shape, dt in zip(blocks, shapes, dtypes)
+        ]
+        names = [block.name for block in blocks]
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(correction, names, shapes, dtypes, instrumentation.is_enabled()),
+        ) as pool:
+            # reads submit to the pool, so they are waited for first
+            with ThreadPoolExecutor(
+                workers, thread_name_prefix="colour_lib-read"
+            ) as reads:
+                free = list(range(n_slots))
+                pending = deque()
+
+                def read(slot, ys, xs):
+                    # decoding releases the GIL, tiles are read concurrently and
+                    # submitted as soon as they are in their slot
+                    h, w = ys.stop - ys.start, xs.stop - xs.start
+                    with span("read_tile"), READERS.cache.bypass():
+                        inputs[slot, :h, :w] = source[ys, xs]
+                    count("zarr_bytes_read", inputs[slot, :h, :w].nbytes)
+                    count("pixels_processed", h * w)
+                    return pool.submit(_correct_slot, slot, h, w)
+
+                def collect():
+                    ys, xs, future = pending.popleft()
+                    slot, records = future.result().result()
+                    if records is not None:
+                        instrumentation.merge(records)
+                    h, w = ys.stop - ys.start, xs.stop - xs.start
+                    free.append(slot)
+                    return ys, xs, outputs[slot, :h, :w].copy()
+
+                for ys, xs in tile_slices(source.shape, (th, tw)):
+                    if not free:
+                        yield collect()
+                    slot = free.pop()
+                    pending.append((ys, xs, reads.submit(read, slot, ys, xs)))
+
+                while pending:
+                    yield collect()
+    finally:
+        del inputs, outputs
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+@traced("apply_tiled")
+def apply_tiled(
+    correction,
+    source,
+    output,
+    tile_size=1024,
+    cctf_type=None,
+    dtype=None,
+    workers=1,
+):
+    """
+    Apply `correction` to `source` tile by tile, so that only one tile of the
+    input and of the output is held in memory at a time.
+
+    Parameters:
+    correction (callable): Maps an (h, w, c) tile to a corrected tile.
+    source (zarr array): Pyramid level to correct, e.g. from `open_level`.
+    output (zarr array, TiledSlideWriter or str): Array supporting slice
+        assignment with the shape of `source`, or a path to a pyramidal
+        (OME-)TIFF or ".zarr" written with `TiledSlideWriter`.
+    tile_size (int or tuple): Tile height and width; multiple of 16 for TIFF.
+    cctf_type (str): CCTF of the scanner, see `TileCorrection`.
+    dtype: Output dtype for TIFF outputs, defaults to the source dtype.
+    workers (int): Number of worker processes, None for all cores. With more
+        than one worker `correction` must be picklable, and a TIFF written to
+        a path is compressed on one thread instead of all cores.
+
+    Returns:
+    The output array or path.
+    """
+    if isinstance(output, str):
+        dtype = source.dtype if dtype is None else dtype
+    else:
+        dtype = output.dtype
+
+    correction = TileCorrection(correction, cctf_type, dtype)
+    if workers == 1:
+        tiles = iter_corrected(correction, source, tile_size)
+    else:
+        tiles = iter_corrected_parallel(
+            correction, source, dtype, tile_size=tile_size, workers=workers
+        )
+
+    if isinstance(output, str):
+        # the worker processes already use the cores
+        writer_workers = None if workers == 1 else 1
+        with TiledSlideWriter(
+            output, source.shape, dtype, tile_size, workers=writer_workers
+        ) as writer:
+            for ys, xs, tile in tiles:
+                writer[ys, xs] = tile
+        return output
+
+    for ys, xs, tile in tiles:
+        output[ys, xs] = tile
+    return output
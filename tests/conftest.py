@@ -0,0 +1,31 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fixtures import palette_pyramid
+
+
+@pytest.fixture(scope="session")
+def palette_path(tmp_path_factory):
+    # 4400 x 4000 rendered palette, the smallest scale the parser handles
+    return palette_pyramid(str(tmp_path_factory.mktemp("palette")), scale=4)
+
+
+@pytest.fixture
+def calibration_dir(tmp_path):
+    # smooth random reflectances of the 25 patches, 340-830 nm in 5 nm steps
+    rng = np.random.default_rng(0)
+    wavelengths = np.arange(340, 835, 5)
+    knots = rng.uniform(0.05, 0.9, (8, 25))
+    reflectances = np.stack(
+        [np.interp(wavelengths, np.linspace(340, 830, 8), k) for k in knots.T], 1
+    )
+    columns = ["CA"] + [f"{row}{col}" for row in "ABCD" for col in range(1, 7)]
+    table = pd.DataFrame(reflectances, columns=columns)
+    table.insert(0, "Wavelength", wavelengths)
+    path = tmp_path / "calibration_data"
+    os.makedirs(path)
+    table.to_csv(path / "wavelengths_5nmstep.csv", index=False)
+    return str(path)
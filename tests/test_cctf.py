@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+import tifffile
+
+from colour_lib.utils import CCTF, image_read
+from colour_lib.utils.CustomCCTF import CustomCCTF
+
+
+@pytest.fixture
+def cctf():
+    return CustomCCTF()
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+@pytest.mark.parametrize("shape", [(7, 3), (5, 4, 3), (2, 3, 4, 3)])
+def test_apply_CCTF_integer_matches_apply_CCTF(cctf, dtype, shape):
+    max_value = np.iinfo(dtype).max
+    image = np.random.default_rng(0).integers(0, max_value, shape, dtype=dtype)
+
+    result = cctf.apply_CCTF_integer("decode", "Gamma 1.8", image)
+    expected = cctf.apply_CCTF("decode", "Gamma 1.8", image / max_value)
+
+    assert result.shape == shape
+    np.testing.assert_allclose(result, expected, atol=1e-12)
+
+
+@pytest.mark.parametrize("shape", [(10,), (4, 4), (4, 4, 1), (4, 4, 4)])
+def test_apply_CCTF_integer_rejects_non_rgb(cctf, shape):
+    with pytest.raises(ValueError, match="RGB"):
+        cctf.apply_CCTF_integer("decode", "Gamma 1.8", np.zeros(shape, np.uint8))
+
+
+@pytest.mark.parametrize(
+    "image",
+    [
+        np.arange(48 * 40 * 3, dtype=np.uint8).reshape(48, 40, 3),
+        np.arange(48 * 40 * 3, dtype=np.uint16).reshape(48, 40, 3),
+        np.linspace(0, 1, 48 * 40 * 3, dtype=np.float32).reshape(48, 40, 3),
+        np.arange(48 * 40, dtype=np.uint8).reshape(48, 40),
+        np.arange(48 * 40 * 4, dtype=np.uint8).reshape(48, 40, 4),
+    ],
+    ids=["uint8", "uint16", "float32", "grey", "rgba"],
+)
+def test_image_read_matches_the_baseline_normalisation(tmp_path, image):
+    path = str(tmp_path / "level.tif")
+    photometric = "rgb" if image.shape[-1] == 3 else "minisblack"
+    tifffile.imwrite(path, image, tile=(16, 16), photometric=photometric)
+
+    # "sRGB" decodes any number of channels, the gamma CCTFs need three
+    result = image_read(path, 0, "sRGB")
+    expected = CCTF.apply_CCTF("decode", "sRGB", image / 255)
+
+    assert result.shape == image.shape
+    np.testing.assert_allclose(result, expected, atol=1e-12)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from colour_lib.utils.circlelib import circle_pixels, create_circle_mask, disk_stencil
+
+
+@pytest.fixture
+def image():
+    rng = np.random.default_rng(0)
+    return rng.random((60, 80, 3))
+
+
+@pytest.mark.parametrize(
+    "y, x, radius",
+    [
+        (30, 40, 7),
+        (30.5, 40.25, 7),
+        (12.37, 50.81, 5.5),
+        (2, 3, 6),
+        (58.6, 78.2, 9),
+        (-3, 40, 5),
+    ],
+)
+def test_circle_pixels_matches_full_mask(image, y, x, radius):
+    centroids = pd.Series({"Y": y, "X": x})
+    expected = image[create_circle_mask(image, centroids, radius)].reshape(-1, 3)
+
+    np.testing.assert_array_equal(circle_pixels(image, y, x, radius), expected)
+
+
+def test_disk_stencil_is_shared_per_radius(image):
+    disk_stencil.cache_clear()
+    for y in range(10, 50, 5):
+        for x in range(10, 70, 5):
+            circle_pixels(image, y, x, 4)
+
+    info = disk_stencil.cache_info()
+    assert info.misses == 1
+    assert info.hits == 8 * 12 - 1
+    assert not disk_stencil(4.0).flags.writeable
+
+
+def test_sub_pixel_centres_do_not_grow_the_cache(image):
+    disk_stencil.cache_clear()
+    rng = np.random.default_rng(1)
+    for y, x in rng.uniform(10, 50, size=(200, 2)):
+        circle_pixels(image, y, x, 4)
+        circle_pixels(image, round(y), round(x), 4)
+
+    assert disk_stencil.cache_info().currsize == 1
@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+
+import pytest
+import tifffile
+
+from colour_lib import cli
+from colour_lib.cli import find_scans, is_up_to_date, main, output_paths
+
+
+def touch(path, mtime=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w"):
+        pass
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_find_scans_skips_outputs_and_other_files(tmp_path):
+    scans = [
+        touch(tmp_path / "a.tif"),
+        touch(tmp_path / "b.ome.tiff"),
+        touch(tmp_path / "c.qptiff"),
+    ]
+    touch(tmp_path / "notes.txt")
+    touch(tmp_path / "a_corrected.ome.tif")
+    touch(tmp_path / "a_corrected.ome.tif.part.ome.tif")
+    os.makedirs(tmp_path / "nested.tif")
+
+    assert find_scans([str(tmp_path)]) == sorted(scans)
+    assert find_scans([str(tmp_path / "*.tif")]) == [scans[0]]
+    assert find_scans([str(tmp_path), str(tmp_path / "a.tif")]) == sorted(scans)
+
+
+@pytest.mark.parametrize(
+    "name, stem",
+    [
+        ("scan.tif", "scan"),
+        ("scan.TIFF", "scan"),
+        ("scan.ome.tiff", "scan"),
+        ("scan.ome.tif", "scan"),
+        ("Calib_Polaris_Scan3.qptiff", "Calib_Polaris_Scan3"),
+        ("scan.v2.tif", "scan.v2"),
+    ],
+)
+def test_output_paths(name, stem):
+    assert output_paths(os.path.join("in", name), "out") == (
+        os.path.join("out", f"{stem}_corrected.ome.tif"),
+        os.path.join("out", f"{stem}_calibration.json"),
+    )
+
+
+@pytest.fixture
+def calibrated(tmp_path):
+    scan = touch(tmp_path / "in" / "scan.tif", mtime=1000)
+    image_path, report_path = output_paths(scan, str(tmp_path / "out"))
+    touch(image_path, mtime=2000)
+    touch(report_path, mtime=2000)
+    with open(report_path, "w") as json_file:
+        json.dump({"regressor": "pls", "level": 0}, json_file)
+    os.utime(report_path, (2000, 2000))
+    return scan, str(tmp_path / "out"), report_path
+
+
+def test_is_up_to_date(calibrated):
+    scan, output_dir, report_path = calibrated
+    assert is_up_to_date(scan, output_dir)
+    assert is_up_to_date(scan, output_dir, {"regressor": "pls", "level": 0})
+    assert not is_up_to_date(scan, output_dir, {"regressor": "tps", "level": 0})
+    assert not is_up_to_date(scan, output_dir, {"tile_size": 1024})
+
+    os.utime(scan, (3000, 3000))
+    assert not is_up_to_date(scan, output_dir)
+
+    os.utime(scan, (1000, 1000))
+    os.remove(report_path)
+    assert not is_up_to_date(scan, output_dir)
+
+
+def test_is_up_to_date_with_a_corrupt_report(calibrated):
+    scan, output_dir, report_path = calibrated
+    with open(report_path, "w") as json_file:
+        json_file.write("{")
+    os.utime(report_path, (2000, 2000))
+    assert not is_up_to_date(scan, output_dir, {"regressor": "pls"})
+
+
+@pytest.fixture
+def calibrate_argv(tmp_path, palette_path, calibration_dir):
+    os.makedirs(tmp_path / "scans")
+    shutil.copy(palette_path, tmp_path / "scans" / "palette.tif")
+    # the output directory is inside the input directory
+    return [
+        "calibrate",
+        str(tmp_path / "scans"),
+        "-o",
+        str(tmp_path / "scans" / "out"),
+        "--reference-basepath",
+        calibration_dir,
+        "--level",
+        "3",
+        "--tile-size",
+        "256",
+        "-j",
+        "1",
+    ]
+
+
+def test_calibrate_smoke(tmp_path, calibrate_argv, capsys):
+    output_dir = tmp_path / "scans" / "out"
+    assert main(calibrate_argv) == 0
+
+    image_path, report_path = output_paths(
+        str(tmp_path / "scans" / "palette.tif"), str(output_dir)
+    )
+    assert sorted(os.listdir(output_dir)) == sorted(
+        [os.path.basename(image_path), os.path.basename(report_path)]
+    )
+    with tifffile.TiffFile(image_path) as tiff:
+        assert tiff.series[0].shape == (4400 >> 3, 4000 >> 3, 3)
+    with open(report_path) as json_file:
+        report = json.load(json_file)
+    assert report["level"] == 3 and report["regressor"] == "pls"
+
+    assert main(calibrate_argv) == 0
+    assert "1 scans found, 1 up to date" in capsys.readouterr().out
+    assert main(calibrate_argv + ["--regressor", "lasso"]) == 0
+    assert "1 scans found, 0 up to date" in capsys.readouterr().out
+
+
+def test_failed_scan_leaves_no_part_file(tmp_path, calibrate_argv, monkeypatch):
+    class FailingRegressor:
+        def __init__(self, train_data, reference_data):
+            pass
+
+        def predict_tiled(self, *args, **kwargs):
+            raise RuntimeError("prediction failed")
+
+    monkeypatch.setitem(cli.REGRESSORS, "pls", FailingRegressor)
+
+    assert main(calibrate_argv) == 1
+    assert os.listdir(tmp_path / "scans" / "out") == []
@@ -0,0 +1,65 @@
+import cv2
+import numpy as np
+import pytest
+
+from fixtures import write_pyramid
+
+from colour_lib.palette_parser.CoarseToFine import CoarseToFineDetector
+from colour_lib.utils import open_pyramid
+
+# objects on level 0: rectangles as first and last pixel inside, circles as
+# centre and radius
+RECTANGLES = {
+    "rect_CA": {"y0": 101, "y1": 498, "x0": 99, "x1": 1903},
+    "rect_1000": {"y0": 603, "y1": 1889, "x0": 150, "x1": 1207},
+}
+CIRCLES = {
+    f"{column}{row}_1000": {"x_centroid": x, "y_centroid": y, "radius": 70}
+    for column, x in zip("ABCD", (300, 555, 810, 1061))
+    for row, y in zip(range(6, 0, -1), (741, 950, 1163, 1370, 1581, 1790))
+}
+LIGHT_LEVEL = 3
+
+
+@pytest.fixture(scope="module")
+def pyramid(tmp_path_factory):
+    image = np.full((2048, 2048, 3), 60, np.uint8)
+    for rect in RECTANGLES.values():
+        image[rect["y0"] : rect["y1"] + 1, rect["x0"] : rect["x1"] + 1] = 235
+    for circle in CIRCLES.values():
+        centre = (circle["x_centroid"], circle["y_centroid"])
+        cv2.circle(image, centre, circle["radius"], (40, 90, 140), -1)
+    path = str(tmp_path_factory.mktemp("pyramid") / "palette.tif")
+    write_pyramid(path, image, levels=LIGHT_LEVEL + 1)
+    return open_pyramid(path)
+
+
+def coarse_detection(seed):
+    # objects as found on the light level, off by up to a pixel there
+    rng = np.random.default_rng(seed)
+    factor = 2**LIGHT_LEVEL
+    detected = {}
+    for key, value in {**RECTANGLES, **CIRCLES}.items():
+        detected[key] = {
+            k: round(v / factor if k == "radius" else (v + 0.5) / factor - 0.5)
+            + (0 if k == "radius" else int(rng.integers(-1, 2)))
+            for k, v in value.items()
+        }
+    return detected
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("target_level", [0, 1])
+def test_refine_lands_within_a_pixel_of_the_truth(pyramid, seed, target_level):
+    refined = CoarseToFineDetector().refine(
+        pyramid, coarse_detection(seed), LIGHT_LEVEL, target_level
+    )
+    factor = 2**target_level
+
+    for key, value in {**RECTANGLES, **CIRCLES}.items():
+        for k, v in value.items():
+            if k == "radius":
+                continue
+            # the truth on the target level, in pixel centres
+            expected = (v + 0.5) / factor - 0.5
+            assert abs(refined[key][k] - expected) <= 1, (key, k)
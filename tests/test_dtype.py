@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+import tifffile
+
+from colour_lib.regressors import LassoRegressor, PLSRegressor, TPSRegressor
+from colour_lib.utils import batch_delta_E, calculate_delta_E, image_read, rgb_to_xyz
+
+# deltaE 2000 differences below this are far under the just noticeable ~1
+DELTA_E_TOLERANCE = 1e-3
+
+
+@pytest.fixture
+def patches():
+    rng = np.random.default_rng(0)
+    observe = rng.uniform(0.02, 0.95, (2, 3, 25, 3))
+    reference = np.clip(observe + rng.normal(0, 0.02, observe.shape), 0.01, 1)
+    return rgb_to_xyz(observe), rgb_to_xyz(reference)
+
+
+def test_calculate_delta_E_float32_matches_float64(patches):
+    observe, reference = patches
+    exact = calculate_delta_E(observe, reference)
+    single = calculate_delta_E(observe.astype(np.float32), reference.astype(np.float32))
+    np.testing.assert_allclose(single, exact, atol=DELTA_E_TOLERANCE)
+
+
+def test_batch_delta_E_float32_matches_float64(patches):
+    observe, reference = patches
+    exact, exact_summary = batch_delta_E(observe, reference)
+    single, single_summary = batch_delta_E(
+        observe.astype(np.float32), reference.astype(np.float32)
+    )
+    np.testing.assert_allclose(
+        single.to_numpy(), exact.to_numpy(), atol=DELTA_E_TOLERANCE
+    )
+    np.testing.assert_allclose(
+        single_summary.to_numpy(), exact_summary.to_numpy(), atol=DELTA_E_TOLERANCE
+    )
+
+
+def test_rgb_to_xyz_float32_pipeline_matches_float64():
+    rgb = np.random.default_rng(1).uniform(0, 1, (64, 64, 3))
+    reference = rgb_to_xyz(np.clip(rgb * 1.02, 0, 1))
+
+    exact = calculate_delta_E(rgb_to_xyz(rgb), reference)
+    single = calculate_delta_E(
+        rgb_to_xyz(rgb.astype(np.float32), dtype=np.float32), reference
+    )
+    assert rgb_to_xyz(rgb.astype(np.float32)).dtype == np.float32
+    np.testing.assert_allclose(single, exact, atol=DELTA_E_TOLERANCE)
+
+
+REGRESSORS = {
+    "pls": lambda x, y: PLSRegressor(x, y),
+    "lasso": lambda x, y: LassoRegressor(x, y, 0.001),
+    "tps": lambda x, y: TPSRegressor(x, y, alpha=0.5),
+}
+
+
+@pytest.fixture
+def chart(tmp_path):
+    # 5 x 5 uniform patches of 8 x 8 pixels with a little noise, and the
+    # reference colours of a slightly non-linear scanner
+    rng = np.random.default_rng(2)
+    colours = rng.uniform(0.05, 0.9, (5, 5, 3))
+    image = np.repeat(np.repeat(colours, 8, 0), 8, 1)
+    image = image + rng.normal(0, 0.01, image.shape)
+    path = str(tmp_path / "chart.tif")
+    tifffile.imwrite(path, np.rint(np.clip(image, 0, 1) * 255).astype(np.uint8))
+    reference = np.clip(colours.reshape(-1, 3) ** 1.1 * 0.95 + 0.02, 0, 1)
+    return path, reference
+
+
+def patch_means(image):
+    return image.reshape(5, 8, 5, 8, 3).mean(axis=(1, 3)).reshape(-1, 3)
+
+
+@pytest.mark.parametrize("name", sorted(REGRESSORS))
+def test_float32_pipeline_chart_delta_E_matches_float64(chart, name):
+    path, reference = chart
+    deltas = {}
+    for dtype in (np.float32, np.float64):
+        image = image_read(path, 0, "Gamma 1.8", dtype=dtype)
+        assert image.dtype == dtype
+        regressor = REGRESSORS[name](patch_means(image), reference)
+        corrected = regressor.predict(image)
+        deltas[dtype] = calculate_delta_E(
+            rgb_to_xyz(patch_means(corrected)), rgb_to_xyz(reference)
+        )
+
+    np.testing.assert_allclose(
+        deltas[np.float32], deltas[np.float64], atol=DELTA_E_TOLERANCE
+    )
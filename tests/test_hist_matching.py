@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+import tifffile
+import zarr
+
+from colour_lib.hist_matching import (
+    HistogramReference,
+    match_histograms,
+    match_histograms_tiled,
+)
+
+
+def image(dtype, shape, seed):
+    rng = np.random.default_rng(seed)
+    max_value = np.iinfo(dtype).max
+    values = rng.beta(2, 5, shape) * max_value
+    return np.rint(values).astype(dtype)
+
+
+@pytest.mark.parametrize("dtype, n_bins", [(np.uint8, 256), (np.uint16, 4096)])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_match_histograms_tiled_matches_match_histograms(dtype, n_bins, workers):
+    reference = HistogramReference.from_image(image(dtype, (90, 70, 3), 0), n_bins)
+    source = image(dtype, (150, 110, 3), 1)
+    output = zarr.zeros(source.shape, chunks=(32, 32, 3), dtype=dtype)
+
+    match_histograms_tiled(
+        zarr.array(source, chunks=(32, 32, 3)),
+        reference,
+        output,
+        tile_size=32,
+        workers=workers,
+    )
+
+    np.testing.assert_array_equal(output[:], match_histograms(source, reference))
+
+
+def test_match_histograms_tiled_to_tiff(tmp_path):
+    reference_path = str(tmp_path / "reference.npz")
+    HistogramReference.from_image(image(np.uint8, (90, 70, 3), 0)).save(reference_path)
+    source = image(np.uint8, (150, 110, 3), 1)
+    path = str(tmp_path / "matched.ome.tif")
+
+    match_histograms_tiled(
+        zarr.array(source, chunks=(64, 64, 3)), reference_path, path, tile_size=64
+    )
+
+    np.testing.assert_array_equal(
+        tifffile.imread(path), match_histograms(source, reference_path)
+    )
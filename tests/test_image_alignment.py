@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from colour_lib.palette_parser.ImageAlignment import ImageAlignment
+
+CIRCLES = {
+    "A1_1000": {"x_centroid": 120, "y_centroid": 40, "radius": 12},
+    "D6_500": {"x_centroid": 15, "y_centroid": 230, "radius": 9},
+}
+RECTANGLES = {
+    "rect_CA": {"y0": 10, "y1": 60, "x0": 20, "x1": 180},
+    "rect_500": {"y0": 150, "y1": 240, "x0": 5, "x1": 90},
+}
+
+
+@pytest.fixture(
+    params=[
+        {},
+        {"flip_horizontal": True},
+        {"flip_vertical": True, "rotation_angle": 2.5},
+        {"flip_over": True, "rotation_angle": -1.0},
+    ]
+)
+def aligner(request):
+    aligner = ImageAlignment()
+    aligner.position.update(request.param)
+    return aligner
+
+
+@pytest.mark.parametrize(
+    "type, coordinates", [("circle", CIRCLES), ("rectangle", RECTANGLES)]
+)
+@pytest.mark.parametrize("scale_factor", [1, 4])
+def test_aligned_coordinates_round_trip(aligner, type, coordinates, scale_factor):
+    original = aligner.give_original_coordinates(
+        coordinates, 200, 250, type, verbose=False, scale_factor=scale_factor
+    )
+    aligned = aligner.give_aligned_coordinates(
+        original, 200, 250, type, scale_factor=scale_factor
+    )
+
+    assert aligned.keys() == coordinates.keys()
+    for key, values in coordinates.items():
+        assert aligned[key].keys() == values.keys()
+        for name, value in values.items():
+            assert aligned[key][name] == pytest.approx(value, abs=1e-9)
+
+
+def test_transform_coordinates_rejects_unknown_types():
+    with pytest.raises(ValueError, match="circle' or 'rectangle"):
+        ImageAlignment().transform_coordinates(CIRCLES, np.eye(3), "ellipse")
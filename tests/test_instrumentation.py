@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import pytest
+import zarr
+
+from colour_lib.regressors import select_model
+from colour_lib.regressors.LassoRegressor import LassoRegressor
+from colour_lib.regressors.PLSregressor import PLSRegressor
+from colour_lib.utils import instrumentation, rgb_to_xyz
+
+
+@pytest.fixture
+def tracing():
+    instrumentation.enable()
+    yield instrumentation
+    instrumentation.disable()
+    instrumentation.reset_records()
+
+
+def test_select_model_with_instrumentation(tracing, tmp_path):
+    rng = np.random.default_rng(0)
+    train = rng.uniform(0.05, 0.9, (12, 3))
+    reference_xyz = rgb_to_xyz(np.clip(train * 1.05, 0, 1))
+    candidates = {
+        "PLS": (PLSRegressor, [{}]),
+        "Lasso": (LassoRegressor, [{"alpha": 0.001}]),
+    }
+
+    for _ in range(2):
+        model, scores = select_model(
+            train, reference_xyz, candidates=candidates, n_jobs=1, cache_dir=tmp_path
+        )
+
+    assert len(scores) == 4
+    spans = tracing.summary()
+    assert spans["evaluate_candidate"]["calls"] == 4
+    assert tracing.counters()["model_cache_misses"] == 4
+    assert tracing.counters()["model_cache_hits"] == 4
+    assert {
+        event["args"]["candidate"]
+        for event in tracing.events()
+        if event["name"] == "evaluate_candidate"
+    } == {"PLS", "Lasso"}
+
+
+def test_span_accepts_a_name_argument(tracing):
+    with tracing.span("outer", name="inner"):
+        pass
+    assert tracing.events()[0]["args"] == {"name": "inner"}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_tiled_pass_counts_each_pixel_once(tracing, workers):
+    source = zarr.array(
+        np.random.default_rng(0).integers(0, 255, (300, 200, 3), dtype=np.uint8),
+        chunks=(128, 128, 3),
+    )
+    train = np.random.default_rng(1).uniform(0.05, 0.9, (12, 3))
+    regressor = PLSRegressor(train, train * 0.9)
+    output = zarr.zeros(source.shape, chunks=(128, 128, 3), dtype=np.uint8)
+
+    regressor.predict_tiled(source, output, "Gamma 1.8", tile_size=128, workers=workers)
+
+    assert tracing.counters()["pixels_processed"] == 300 * 200
+
+
+def test_worker_spans_are_merged_into_the_parent(tracing):
+    source = zarr.array(
+        np.random.default_rng(0).integers(0, 255, (256, 256, 3), dtype=np.uint8),
+        chunks=(128, 128, 3),
+    )
+    train = np.random.default_rng(1).uniform(0.05, 0.9, (12, 3))
+    regressor = PLSRegressor(train, train * 0.9)
+    output = zarr.zeros(source.shape, chunks=(128, 128, 3), dtype=np.uint8)
+
+    regressor.predict_tiled(source, output, "Gamma 1.8", tile_size=128, workers=2)
+
+    worker_events = [event for event in tracing.events() if event["pid"] != os.getpid()]
+    names = {event["name"] for event in worker_events}
+    assert {"correct_tile", "PLSRegressor.predict"} <= names
+    assert sum(event["name"] == "correct_tile" for event in worker_events) == 4
+    assert tracing.counters()["predict_pixels"] == 256 * 256
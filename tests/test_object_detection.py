@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+import pytest
+
+from colour_lib.palette_parser.ObjectDetection import ObjectDetection
+
+
+def nested_loop_groups(coordinates, threshold):
+    # the grouping find_circles used before the grid hash
+    groups = []
+    for i, coord in enumerate(coordinates):
+        for group in groups:
+            if all(
+                np.linalg.norm(np.array(coord) - np.array(coordinates[j])) <= threshold
+                for j in group
+            ):
+                group.append(i)
+                break
+        else:
+            groups.append([i])
+    return groups
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("threshold", [0, 3, 10, 25.5])
+def test_group_circles_matches_the_nested_loop(seed, threshold):
+    # dense clusters of integer candidates, so that groups overlap and compete
+    rng = np.random.default_rng(seed)
+    centres = rng.integers(0, 200, (30, 3))
+    coordinates = (
+        centres[rng.integers(0, len(centres), 250)] + rng.integers(-12, 13, (250, 3))
+    ).tolist()
+
+    assert ObjectDetection.group_circles(coordinates, threshold) == nested_loop_groups(
+        coordinates, threshold
+    )
+
+
+def test_find_circles_confidence():
+    # rings give an outer and an inner contour, filled disks a single one
+    image = np.zeros((400, 400), np.uint8)
+    for x in (60, 160, 260):
+        cv2.circle(image, (x, 100), 30, 255, 3)
+    cv2.circle(image, (160, 300), 30, 255, -1)
+
+    circles, confidence = ObjectDetection().find_circles(
+        image, averaging_threshold=10, return_confidence=True
+    )
+
+    assert len(circles) == len(confidence) == 4
+    assert circles == ObjectDetection().find_circles(image, averaging_threshold=10)
+    by_centre = {(x // 10, y // 10): c for (x, y, _), c in zip(circles, confidence)}
+    assert by_centre == {(6, 10): 1.0, (16, 10): 1.0, (26, 10): 1.0, (16, 30): 0.5}
@@ -0,0 +1,141 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from colour.models.rgb import RGB_COLOURSPACES, XYZ_to_RGB
+
+from colour_lib.utils.rawparser import RawDataParser
+
+
+@pytest.fixture
+def calculations(monkeypatch):
+    # number of XYZ charts actually computed
+    calls = []
+    calculate = RawDataParser.calculate_xyz_chart
+
+    def counting(self, *args, **kwargs):
+        calls.append(1)
+        return calculate(self, *args, **kwargs)
+
+    monkeypatch.setattr(RawDataParser, "calculate_xyz_chart", counting)
+    return calls
+
+
+def cache_files(calibration_dir):
+    return sorted(os.listdir(os.path.join(calibration_dir, ".cache")))
+
+
+def test_chart_cache_miss_then_hit(calibration_dir, calculations):
+    first = RawDataParser(calibration_dir).get_reference_xyz("D50")
+    assert len(calculations) == 1
+    assert len(cache_files(calibration_dir)) == 1
+
+    second = RawDataParser(calibration_dir).get_reference_xyz("D50")
+    assert len(calculations) == 1
+    np.testing.assert_array_equal(second, first)
+
+    RawDataParser(calibration_dir).get_reference_xyz("D50", observer="10")
+    assert len(calculations) == 2
+    assert len(cache_files(calibration_dir)) == 2
+
+
+@pytest.mark.parametrize("content", [b"", b"not a zip file", b"PK\x03\x04broken"])
+def test_corrupt_cache_files_are_regenerated(calibration_dir, calculations, content):
+    expected = RawDataParser(calibration_dir).get_reference_xyz()
+    (name,) = cache_files(calibration_dir)
+    with open(os.path.join(calibration_dir, ".cache", name), "wb") as cache_file:
+        cache_file.write(content)
+
+    chart = RawDataParser(calibration_dir).get_reference_xyz()
+    assert len(calculations) == 2
+    np.testing.assert_array_equal(chart, expected)
+    # the rewritten file is read by the next parser
+    RawDataParser(calibration_dir).get_reference_xyz()
+    assert len(calculations) == 2
+    assert cache_files(calibration_dir) == [name]
+
+
+def test_cache_key_changes_with_the_csv(calibration_dir, calculations):
+    before = RawDataParser(calibration_dir).get_reference_xyz()
+    csv_path = os.path.join(calibration_dir, "wavelengths_5nmstep.csv")
+    table = pd.read_csv(csv_path)
+    table["A1"] *= 0.5
+    table.to_csv(csv_path, index=False)
+
+    after = RawDataParser(calibration_dir).get_reference_xyz()
+    assert len(calculations) == 2
+    assert len(cache_files(calibration_dir)) == 2
+    np.testing.assert_allclose(after[1], before[1] * 0.5)
+
+
+def test_use_cache_false_always_recomputes(calibration_dir, calculations):
+    for _ in range(2):
+        RawDataParser(calibration_dir, use_cache=False).get_reference_xyz()
+    assert len(calculations) == 2
+    assert not os.path.exists(os.path.join(calibration_dir, ".cache"))
+
+
+def test_charts_are_memoized_per_parser(calibration_dir, calculations):
+    parser = RawDataParser(calibration_dir, use_cache=False)
+    assert parser.get_reference_xyz() is parser.get_reference_xyz()
+    assert len(calculations) == 1
+
+
+@pytest.fixture
+def grey_calibration_dir(calibration_dir):
+    # CA is a flat 90% reflector, neutral under any illuminant once adapted
+    csv_path = os.path.join(calibration_dir, "wavelengths_5nmstep.csv")
+    table = pd.read_csv(csv_path)
+    table["CA"] = 0.9
+    table.to_csv(csv_path, index=False)
+    return calibration_dir
+
+
+def per_patch_rgb(xyz_chart, colourspace):
+    # the chart computation before it was vectorised
+    rgb = np.array(
+        [
+            XYZ_to_RGB(
+                XYZ=xyz,
+                colourspace=RGB_COLOURSPACES[colourspace],
+                apply_cctf_encoding=False,
+            )
+            for xyz in xyz_chart
+        ]
+    )
+    rgb[rgb < 0] = 0
+    return rgb
+
+
+@pytest.mark.parametrize("colourspace", ["sRGB", "NTSC (1987)"])
+def test_rgb_chart_matches_the_per_patch_loop(calibration_dir, colourspace):
+    parser = RawDataParser(calibration_dir, use_cache=False)
+    xyz_chart = parser.get_reference_xyz("D65")
+    expected = per_patch_rgb(xyz_chart, colourspace)
+
+    np.testing.assert_allclose(
+        parser.calculate_rgb_chart(xyz_chart, colourspace), expected, atol=1e-12
+    )
+    # D65 is the white of both, the adaptation barely moves the chart
+    np.testing.assert_allclose(
+        parser.get_reference_rgb(colourspace), expected, atol=1e-3
+    )
+
+
+@pytest.mark.parametrize(
+    "illuminant, observer", [("FL2", "10"), ("A", "2"), ("D50", "10"), ("D65", "10")]
+)
+def test_reference_charts_for_other_illuminants_and_observers(
+    grey_calibration_dir, illuminant, observer
+):
+    parser = RawDataParser(grey_calibration_dir)
+    xyz = parser.get_reference_xyz(illuminant, observer)
+    rgb = parser.get_reference_rgb("sRGB", illuminant, observer)
+
+    assert xyz.shape == rgb.shape == (25, 3)
+    assert np.isfinite(rgb).all()
+    assert xyz[0, 1] == pytest.approx(0.9, abs=1e-3)
+    # the grey patch is adapted to the sRGB white
+    np.testing.assert_allclose(rgb[0], 0.9, atol=3e-3)
+    assert not np.allclose(xyz, parser.get_reference_xyz("D65", "2"))
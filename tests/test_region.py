@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+import zarr
+
+from colour_lib.utils import CCTF
+from colour_lib.utils.region import RegionView, scale_region, select_level
+
+
+@pytest.fixture
+def level():
+    image = np.arange(60 * 40 * 3, dtype=np.uint16).reshape(60, 40, 3)
+    return image, zarr.array(image, chunks=(16, 16, 3))
+
+
+@pytest.mark.parametrize(
+    "region", [None, (slice(10, 50), slice(5, 25)), (slice(-20, None), slice(0, 40))]
+)
+@pytest.mark.parametrize("flip", [None, 0, 1, (0, 1)])
+def test_region_view_matches_numpy(level, region, flip):
+    image, array = level
+    expected = image if region is None else image[region]
+    if flip is not None:
+        expected = np.flip(expected, flip)
+    view = RegionView(array, region, flip=flip)
+
+    assert view.shape == expected.shape
+    np.testing.assert_array_equal(np.asarray(view), expected)
+    for key in [
+        (slice(2, 9), slice(None, None, -2)),
+        (slice(None, None, -3), 4),
+        (-1, Ellipsis),
+        (Ellipsis, 1),
+        (slice(5, 2), slice(None)),
+    ]:
+        np.testing.assert_array_equal(view[key], expected[key])
+
+
+def test_region_view_decodes_the_cctf(level):
+    image, _ = level
+    array = zarr.array((image % 256).astype(np.uint8), chunks=(16, 16, 3))
+    view = RegionView(array, (slice(4, 20), slice(8, 30)), cctf_type="Gamma 1.8")
+    expected = CCTF.apply_CCTF("decode", "Gamma 1.8", image[4:20, 8:30] % 256 / 255)
+    np.testing.assert_allclose(view[...], expected, atol=1e-12)
+
+
+@pytest.mark.parametrize(
+    "region", [(slice(50, 10), slice(None)), (slice(None), slice(30, -20))]
+)
+def test_region_view_rejects_reversed_regions(level, region):
+    with pytest.raises(ValueError, match="increasing range"):
+        RegionView(level[1], region)
+
+
+def test_region_view_rejects_stepped_regions(level):
+    with pytest.raises(ValueError, match="increasing range"):
+        RegionView(level[1], (slice(0, 10, 2), slice(None)))
+
+
+def test_scale_region_rounds_outwards():
+    region = (slice(3, 9), slice(None))
+    assert scale_region(region, (40, 20), (10, 5)) == (slice(0, 3), slice(0, 5))
+    assert scale_region(region, (40, 20), (40, 20)) == (slice(3, 9), slice(0, 20))
+
+
+def test_select_level():
+    levels = [np.empty((1024 >> k, 768 >> k, 3)) for k in range(4)]
+    assert select_level(levels, (100, 90)) == 3
+    assert select_level(levels, (100, 100)) == 2
+    assert select_level(levels, (200, 100)) == 2
+    assert select_level(levels, (2000, 100)) == 0
+    region = (slice(0, 512), slice(0, 512))
+    assert select_level(levels, (128, 128), region) == 2
+    region = (slice(0, 256), slice(0, 256))
+    assert select_level(levels, (128, 128), region, region_level=1) == 2
+    assert select_level(levels, (129, 128), region, region_level=1) == 1
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from colour_lib.regressors import (
+    LassoRegressor,
+    LUTRegressor,
+    PLSRegressor,
+    TPSRegressor,
+    bake_lut,
+    select_model,
+)
+from colour_lib.utils import calculate_delta_E, rgb_to_xyz
+
+
+@pytest.fixture
+def patches():
+    rng = np.random.default_rng(0)
+    train = rng.uniform(0.05, 0.9, (25, 3))
+    reference = np.clip(train @ np.diag([0.9, 1.0, 1.1]) + 0.02, 0, 1)
+    return train, reference
+
+
+@pytest.mark.parametrize(
+    "factory", [PLSRegressor, lambda x, y: LassoRegressor(x, y, 0.001)]
+)
+def test_linear_predict_inplace_matches_copy(patches, factory):
+    regressor = factory(*patches)
+    image = np.random.default_rng(1).uniform(0, 1, (8, 9, 3)).astype(np.float32)
+
+    expected = regressor.predict(image)
+    result = regressor.predict(image, inplace=True)
+
+    assert result.dtype == np.float32
+    assert np.shares_memory(result, image)
+    np.testing.assert_allclose(result, expected)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16, np.int32])
+def test_linear_predict_inplace_rejects_integer_images(patches, dtype):
+    regressor = PLSRegressor(*patches)
+    image = np.zeros((4, 4, 3), dtype)
+
+    with pytest.raises(TypeError, match="float"):
+        regressor.predict(image, inplace=True)
+    assert regressor.predict(image).dtype == np.float64
+
+
+def test_select_model_reads_the_same_ranking_from_the_cache(patches, tmp_path):
+    train, reference = patches
+    candidates = {
+        "PLS": (PLSRegressor, [{}]),
+        "Lasso": (LassoRegressor, [{"alpha": alpha} for alpha in (0.001, 0.1)]),
+    }
+    runs = [
+        select_model(
+            train,
+            rgb_to_xyz(reference),
+            candidates=candidates,
+            n_jobs=1,
+            cache_dir=tmp_path,
+        )
+        for _ in range(2)
+    ]
+
+    assert len(list(tmp_path.iterdir())) == 6
+    (_, first), (best, second) = runs
+    columns = ["name", "space", "params", "mean_delta_E", "max_delta_E"]
+    assert first[columns].equals(second[columns])
+    np.testing.assert_allclose(
+        best.predict(train), first["model"][0].predict(train), rtol=1e-12
+    )
+
+
+class DarkPLSRegressor(PLSRegressor):
+    # a different model with the same parameters as PLSRegressor
+    def __init__(self, train_data, reference_data):
+        super().__init__(train_data, reference_data * 0.8)
+
+
+def test_select_model_cache_tells_classes_with_the_same_name_apart(patches, tmp_path):
+    train, reference = patches
+    results = [
+        select_model(
+            train,
+            rgb_to_xyz(reference),
+            candidates={"PLS": (cls, [{}])},
+            spaces=("RGB",),
+            n_jobs=1,
+            cache_dir=tmp_path,
+        )[1]
+        for cls in (PLSRegressor, DarkPLSRegressor)
+    ]
+
+    assert type(results[1]["model"][0]) is DarkPLSRegressor
+    assert results[0]["mean_delta_E"][0] < results[1]["mean_delta_E"][0]
+
+
+@pytest.mark.parametrize("method", ["tetrahedral", "trilinear"])
+def test_lut_matches_the_exact_model_within_the_reported_delta_E(patches, method):
+    train, reference = patches
+    regressor = TPSRegressor(train, reference, alpha=0.5)
+    lut = bake_lut(regressor, 33, method, patches=train, colourspace="sRGB")
+
+    deltas = calculate_delta_E(
+        rgb_to_xyz(lut.predict(train[np.newaxis])[0]),
+        rgb_to_xyz(regressor.predict(train[np.newaxis])[0]),
+    )
+    assert lut.report["max_delta_E"] < 0.5
+    assert deltas.max() == pytest.approx(lut.report["max_delta_E"])
+    assert deltas.mean() == pytest.approx(lut.report["mean_delta_E"])
+
+
+@pytest.mark.parametrize("method", ["tetrahedral", "trilinear"])
+def test_lut_of_an_affine_model_is_exact(patches, method):
+    train, _ = patches
+    # maps the unit cube inside [0, 1], so that no node is clipped
+    regressor = PLSRegressor(train, train @ np.diag([0.8, 0.7, 0.9]) + 0.05)
+    lut = bake_lut(regressor, 9, method)
+    pixels = np.random.default_rng(3).uniform(0, 1, (1, 4000, 3))
+
+    np.testing.assert_allclose(
+        lut.predict(pixels), regressor.predict(pixels), atol=1e-5
+    )
+
+
+@pytest.mark.parametrize("size", [0, 1])
+def test_lut_needs_two_nodes_per_axis(patches, size):
+    with pytest.raises(ValueError, match="at least 2 nodes"):
+        bake_lut(PLSRegressor(*patches), size)
+    with pytest.raises(ValueError, match="at least 2 nodes"):
+        LUTRegressor(np.zeros((size,) * 3 + (3,)))
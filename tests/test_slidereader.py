@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import tifffile
+
+from colour_lib.utils.slidereader import READERS, SlideReaderPool, TileCache
+from colour_lib.utils.tiles import iter_corrected
+
+
+def test_streaming_reads_bypass_the_tile_cache(tmp_path):
+    path = str(tmp_path / "slide.tif")
+    image = np.random.default_rng(0).integers(0, 255, (256, 256, 3), dtype=np.uint8)
+    tifffile.imwrite(path, image, tile=(64, 64), compression="zlib")
+    readers = SlideReaderPool(decode_workers=1)
+    level = readers.open(path)
+
+    with readers.cache.bypass():
+        np.testing.assert_array_equal(level[:], image)
+    assert len(readers.cache) == 0
+
+    np.testing.assert_array_equal(level[:128, :128], image[:128, :128])
+    assert len(readers.cache) == 4
+    with readers.cache.bypass():
+        np.testing.assert_array_equal(level[:], image)
+    assert len(readers.cache) == 4
+
+
+def test_tiled_pass_does_not_fill_the_tile_cache(tmp_path):
+    path = str(tmp_path / "slide.tif")
+    image = np.zeros((256, 256, 3), np.uint8)
+    tifffile.imwrite(path, image, tile=(64, 64))
+    level = READERS.open(path)
+    try:
+        tiles = list(iter_corrected(lambda tile: tile, level, tile_size=64))
+        assert len(tiles) == 16
+        assert not [key for key in READERS.cache._tiles if key[0][0] == path]
+    finally:
+        READERS.close(path)
+
+
+def test_tile_cache_default_size(monkeypatch):
+    assert TileCache().max_bytes == 128 << 20
+    monkeypatch.setenv("COLOUR_LIB_TILE_CACHE_MB", "16")
+    assert SlideReaderPool().cache.max_bytes == 16 << 20
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_evicted_slides_are_closed(tmp_path):
+    paths = []
+    for i in range(4):
+        paths.append(str(tmp_path / f"slide{i}.tif"))
+        tifffile.imwrite(paths[-1], np.full((64, 64, 3), i, np.uint8), tile=(32, 32))
+    readers = SlideReaderPool(max_open=1, decode_workers=1)
+
+    before = open_fds()
+    levels = []
+    for path in paths:
+        levels.append(readers.open(path))
+        levels[-1][:]
+    # only the file of the slide in the pool stays open
+    assert open_fds() <= before + 1
+    # evicted slides reopen their file when read again
+    assert [level[0, 0, 0] for level in levels] == [0, 1, 2, 3]
+
+
+def test_decode_pool_is_resized_for_open_slides(tmp_path):
+    path = str(tmp_path / "slide.tif")
+    image = np.random.default_rng(0).integers(0, 255, (256, 256, 3), dtype=np.uint8)
+    tifffile.imwrite(path, image, tile=(32, 32))
+    readers = SlideReaderPool(decode_workers=2)
+    level = readers.open(path)
+    old = readers.executor()
+
+    readers.decode_workers = 3
+    np.testing.assert_array_equal(level[:], image)
+    assert readers.executor() is not old and readers.executor()._max_workers == 3
+    assert old._shutdown
+
+    readers.decode_workers = 1
+    assert readers.executor() is None
+    readers.close()
+    np.testing.assert_array_equal(level[:], image)
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pytest
+import zarr
+
+from colour_lib.utils import tiles
+from colour_lib.utils.slidewriter import TiledSlideWriter
+
+
+@pytest.mark.parametrize("tile_size", [300, (256, 300)])
+def test_tiff_tile_size_must_be_a_multiple_of_16(tmp_path, tile_size):
+    with pytest.raises(ValueError, match="multiple of 16"):
+        TiledSlideWriter(str(tmp_path / "out.tif"), (600, 600, 3), np.uint8, tile_size)
+    assert not list(tmp_path.iterdir())
+
+
+def test_zarr_accepts_any_tile_size(tmp_path):
+    image = np.arange(600 * 600 * 3, dtype=np.uint16).reshape(600, 600, 3)
+    with TiledSlideWriter(
+        str(tmp_path / "out.zarr"), image.shape, image.dtype, 300, workers=1
+    ) as writer:
+        for y in range(0, 600, 300):
+            for x in range(0, 600, 300):
+                ys, xs = slice(y, y + 300), slice(x, x + 300)
+                writer[ys, xs] = image[ys, xs]
+    np.testing.assert_array_equal(zarr.open(str(tmp_path / "out.zarr"))["0"], image)
+
+
+@pytest.mark.parametrize("workers, writer_workers", [(1, 8), (2, 1)])
+def test_apply_tiled_leaves_the_cores_to_worker_processes(
+    tmp_path, monkeypatch, workers, writer_workers
+):
+    writers = []
+
+    class RecordingWriter(TiledSlideWriter):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            writers.append(self)
+
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(tiles, "TiledSlideWriter", RecordingWriter)
+    source = zarr.array(np.zeros((64, 64, 3), np.uint8), chunks=(32, 32, 3))
+
+    tiles.apply_tiled(
+        lambda tile: tile, source, str(tmp_path / "out.tif"), 32, workers=workers
+    )
+
+    assert [writer.workers for writer in writers] == [writer_workers]
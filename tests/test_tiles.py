@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+import tifffile
+import zarr
+
+from colour_lib.utils import open_level
+from colour_lib.utils.tiles import iter_corrected, iter_corrected_parallel
+
+
+def invert(tile):
+    # module level, so that worker processes can unpickle it
+    return 255 - tile
+
+
+@pytest.fixture(params=["zarr", "tiff"])
+def source(request, tmp_path):
+    image = np.random.default_rng(0).integers(0, 255, (300, 200, 3), dtype=np.uint8)
+    if request.param == "zarr":
+        return zarr.array(image, chunks=(64, 64, 3))
+    path = str(tmp_path / "slide.tif")
+    tifffile.imwrite(path, image, tile=(64, 64), compression="zlib")
+    return open_level(path, 0)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_iter_corrected_parallel_matches_iter_corrected(source, workers):
+    expected = list(iter_corrected(invert, source, tile_size=128))
+    result = list(
+        iter_corrected_parallel(
+            invert, source, np.uint8, tile_size=128, workers=workers
+        )
+    )
+
+    assert [(ys, xs) for ys, xs, _ in result] == [(ys, xs) for ys, xs, _ in expected]
+    for (_, _, tile), (_, _, expected_tile) in zip(result, expected):
+        np.testing.assert_array_equal(tile, expected_tile)
+
+
+def test_iter_corrected_parallel_needs_a_worker(source):
+    with pytest.raises(ValueError, match="workers must be at least 1"):
+        next(iter_corrected_parallel(invert, source, np.uint8, workers=0))